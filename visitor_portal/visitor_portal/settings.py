@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Load env from .env if present
 try:
     from dotenv import load_dotenv  # type: ignore
@@ -70,6 +72,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Static files in production
+    'visitors.middleware.RequestMetricsMiddleware',  # Timings for everything below
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,7 +86,7 @@ ROOT_URLCONF = 'visitor_portal.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'visitors.metrics.TimedDjangoTemplates',  # DjangoTemplates that times renders
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -176,9 +179,6 @@ STATICFILES_DIRS = [
     BASE_DIR.parent / 'static',       # project root static/
 ]
 
-# WhiteNoise for serving static files in production
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-
 # WhiteNoise compression and caching settings for better mobile performance
 WHITENOISE_AUTOREFRESH = False
 WHITENOISE_USE_FINDERS = False
@@ -189,12 +189,46 @@ SECURE_CROSS_ORIGIN_OPENER_POLICY = None
 # Media uploads (visitor photos and IDs)
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Uploads are re-encoded on save (upright, EXIF stripped, longest side capped)
+# as WEBP or JPEG; square thumbnails for the dashboard and admin are made on
+# background threads after upload (0 workers makes them on first view instead).
+IMAGE_FORMAT = os.getenv('IMAGE_FORMAT', 'WEBP')
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', '1600'))
+IMAGE_QUALITY = int(os.getenv('IMAGE_QUALITY', '80'))
+IMAGE_THUMBNAIL_SIZE = int(os.getenv('IMAGE_THUMBNAIL_SIZE', '240'))
+IMAGE_THUMBNAIL_WORKERS = int(os.getenv('IMAGE_THUMBNAIL_WORKERS', '1'))
+# Uploads are stored under their SHA-256 (identical files kept once). 'local'
+# keeps them in MEDIA_ROOT; 's3' uses an S3-compatible bucket (R2, MinIO, AWS),
+# which survives redeploys. `manage.py rehash_media` moves existing files over.
+MEDIA_STORAGE = os.getenv('MEDIA_STORAGE', 'local')
+if MEDIA_STORAGE == 's3':
+    MEDIA_STORAGE_BACKEND = {
+        'BACKEND': 'visitors.storage.ContentAddressedS3Storage',
+        'OPTIONS': {
+            'endpoint_url': os.getenv('MEDIA_S3_ENDPOINT_URL', ''),
+            'bucket': os.getenv('MEDIA_S3_BUCKET', ''),
+            'access_key_id': os.getenv('MEDIA_S3_ACCESS_KEY_ID', ''),
+            'secret_access_key': os.getenv('MEDIA_S3_SECRET_ACCESS_KEY', ''),
+            'region': os.getenv('MEDIA_S3_REGION', 'us-east-1'),
+            'public_url': os.getenv('MEDIA_S3_PUBLIC_URL', ''),  # empty serves presigned URLs
+        },
+    }
+else:
+    MEDIA_STORAGE_BACKEND = {'BACKEND': 'visitors.storage.ContentAddressedFileSystemStorage'}
+STORAGES = {
+    'default': MEDIA_STORAGE_BACKEND,
+    # WhiteNoise serves hashed, pre-compressed copies made by collectstatic
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Tests use the source static files; the manifest exists only after collectstatic
+TEST_RUNNER = 'visitor_portal.test_runner.TestRunner'
+
 # Auth
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/control/'
@@ -204,6 +238,90 @@ LOGOUT_REDIRECT_URL = '/login/'
 # Render doesn't support SMTP, so we use Brevo API (free, no domain required)
 BREVO_API_KEY = os.getenv('BREVO_API_KEY', '')
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'noreply@eterna.com')
+# One Brevo client is shared per process; the pool size caps kept-alive
+# connections and should cover the outbox worker concurrency.
+BREVO_API_HOST = os.getenv('BREVO_API_HOST', '')  # empty uses the SDK default
+BREVO_CONNECTION_POOL_SIZE = int(os.getenv('BREVO_CONNECTION_POOL_SIZE', '4'))
+BREVO_TIMEOUT = float(os.getenv('BREVO_TIMEOUT', '10'))  # seconds
+
+# Loads the logged-in user together with their guard membership in one query.
+# Never cached: manage_users runs in its own process and must take effect at once.
+AUTHENTICATION_BACKENDS = ['visitors.roles.CachedModelBackend']
 
 # Password reset settings   
-PASSWORD_RESET_TIMEOUT = 3600  # 1 hour
\ No newline at end of file
+PASSWORD_RESET_TIMEOUT = 3600  # 1 hour
+# Cache. Without CACHE_URL each process keeps its own in-memory cache, which
+# is fine for the single gunicorn worker; use file:///path or redis://host
+# (needs the redis package) to share OTP codes and counters across processes.
+CACHE_URL = os.getenv('CACHE_URL', '')
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': CACHE_URL}}
+elif CACHE_URL.startswith('file://'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': CACHE_URL[len('file://'):]}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# Sessions hold the kiosk's active visit and guard logins. 'cached_db' reads
+# them from the cache and only writes through to django_session; 'db' hits the
+# table on every request; 'signed_cookies' keeps them in the browser with no
+# server state (a logout cannot revoke a copied cookie before it expires).
+# With several processes, cached_db needs a shared CACHE_URL.
+SESSION_MODE = os.getenv('SESSION_MODE', 'cached_db')
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+if SESSION_MODE not in SESSION_ENGINES:
+    raise ImproperlyConfigured(f"SESSION_MODE must be one of {', '.join(SESSION_ENGINES)}, not {SESSION_MODE!r}")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
+SESSION_COOKIE_AGE = int(os.getenv('SESSION_COOKIE_AGE', str(60 * 60 * 24 * 14)))  # seconds
+
+# Intake OTP codes live in the cache (OTP_CACHE alias), never the session or DB.
+OTP_CACHE = os.getenv('OTP_CACHE', 'default')
+OTP_TTL_SECONDS = int(os.getenv('OTP_TTL_SECONDS', '300'))
+OTP_MAX_ATTEMPTS = int(os.getenv('OTP_MAX_ATTEMPTS', '5'))  # wrong codes before one is void
+# The OTP email is sent while the kiosk waits, so Brevo gets this long to connect
+# and again to answer (not BREVO_TIMEOUT); a slow send fails and is re-requested.
+OTP_EMAIL_TIMEOUT = float(os.getenv('OTP_EMAIL_TIMEOUT', '1'))  # seconds
+# Fixed-window limits; 0 disables a limit
+OTP_RATE_WINDOW_SECONDS = int(os.getenv('OTP_RATE_WINDOW_SECONDS', '900'))
+OTP_SENDS_PER_EMAIL = int(os.getenv('OTP_SENDS_PER_EMAIL', '5'))
+OTP_SENDS_PER_IP = int(os.getenv('OTP_SENDS_PER_IP', '20'))
+OTP_VERIFIES_PER_IP = int(os.getenv('OTP_VERIFIES_PER_IP', '60'))
+# Reverse proxies in front of the app (Render's router counts as one); the
+# client address is read from X-Forwarded-For past them, else REMOTE_ADDR.
+TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', '0'))
+
+# Active-employee directory used by the intake autocomplete. Empty keeps it in
+# process memory and checks a count/last-change stamp of the employee table at
+# most every EMPLOYEE_DIRECTORY_STAMP_SECONDS, so imports from other processes
+# show up within that delay; set to a shared CACHES alias (redis/file
+# CACHE_URL) to share it and skip that query altogether.
+EMPLOYEE_DIRECTORY_CACHE = os.getenv('EMPLOYEE_DIRECTORY_CACHE', '')
+EMPLOYEE_DIRECTORY_STAMP_SECONDS = float(os.getenv('EMPLOYEE_DIRECTORY_STAMP_SECONDS', '5'))
+
+# Request metrics: Prometheus text at /control/metrics/ for guards, or for a
+# scraper sending 'Authorization: Bearer <METRICS_TOKEN>'. Server-Timing
+# headers show db/template/provider time per request in browser dev tools.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_SERVER_TIMING = os.getenv('METRICS_SERVER_TIMING', 'True') == 'True'
+
+# Dashboard visit search: 'auto' picks PostgreSQL full-text on Postgres and the
+# SQLite FTS5 shadow table in development; 'basic' forces plain LIKE matching.
+VISIT_SEARCH_BACKEND = os.getenv('VISIT_SEARCH_BACKEND', 'auto')
+
+# Dashboard live updates (Server-Sent Events). Under WSGI each open stream holds
+# one of the worker's threads (4 in the Procfile), so cap them and recycle
+# connections; guards past the cap poll for the same deltas. ASGI has no limit.
+DASHBOARD_EVENTS_WSGI_MAX_STREAMS = int(os.getenv('DASHBOARD_EVENTS_WSGI_MAX_STREAMS', '1'))
+DASHBOARD_EVENTS_WSGI_STREAM_SECONDS = int(os.getenv('DASHBOARD_EVENTS_WSGI_STREAM_SECONDS', '30'))
+
+# Notification outbox. Messages are stored first and the web process makes the
+# first delivery attempt on this many background threads (0 leaves everything
+# to `manage.py run_outbox`, which also retries failures with backoff).
+OUTBOX_INLINE_WORKERS = int(os.getenv('OUTBOX_INLINE_WORKERS', '2'))
+# After this many consecutive failures a provider is skipped for the reset
+# period, then tried again with a single message.
+OUTBOX_BREAKER_THRESHOLD = int(os.getenv('OUTBOX_BREAKER_THRESHOLD', '5'))
+OUTBOX_BREAKER_RESET_SECONDS = float(os.getenv('OUTBOX_BREAKER_RESET_SECONDS', '60'))
@@ -0,0 +1,23 @@
+"""
+Test runner for visitor_portal.
+
+The static files storage links the hashed copies listed in collectstatic's
+manifest, which a test run never builds; tests render against the source
+files instead.
+"""
+
+from django.conf import settings
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        staticfiles = {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}
+        self._storages = override_settings(STORAGES={**settings.STORAGES, 'staticfiles': staticfiles})
+        self._storages.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._storages.disable()
+        super().teardown_test_environment(**kwargs)
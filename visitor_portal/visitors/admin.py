@@ -1,14 +1,18 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
-from .models import Employee, Visitor, Visit
+from django.utils import timezone
+from django.utils.html import format_html
+from .durations import longer_than, with_elapsed
+from .events import publish_visit_event
+from .models import Employee, OutboundMessage, Visitor, Visit
 
 
 @admin.register(Employee)
 class EmployeeAdmin(admin.ModelAdmin):
-    list_display = ("name", "department", "phone", "email", "active")
+    list_display = ("name", "employee_code", "department", "phone", "email", "active")
     list_filter = ("active", "department")
-    search_fields = ("name", "phone", "email", "department")
+    search_fields = ("name", "employee_code", "phone", "email", "department")
     list_editable = ("active",)
     ordering = ("name",)
     
@@ -17,17 +21,18 @@ class EmployeeAdmin(admin.ModelAdmin):
             'fields': ('name', 'phone', 'email')
         }),
         ('Work Details', {
-            'fields': ('department', 'active')
+            'fields': ('employee_code', 'department', 'active')
         }),
     )
 
 
 @admin.register(Visitor)
 class VisitorAdmin(admin.ModelAdmin):
-    list_display = ("full_name", "phone", "address", "govt_id_type", "created_at")
+    list_display = ("thumbnail", "full_name", "phone", "address", "govt_id_type", "created_at")
+    list_display_links = ("thumbnail", "full_name")
     search_fields = ("full_name", "phone", "address")
     list_filter = ("govt_id_type", "created_at")
-    readonly_fields = ("created_at",)
+    readonly_fields = ("created_at", "thumbnail", "govt_id_thumbnail")
     ordering = ("-created_at",)
     
     fieldsets = (
@@ -38,7 +43,7 @@ class VisitorAdmin(admin.ModelAdmin):
             'fields': ('govt_id_type',)
         }),
         ('Documents', {
-            'fields': ('photo', 'govt_id_image')
+            'fields': (('photo', 'thumbnail'), ('govt_id_image', 'govt_id_thumbnail'))
         }),
         ('System Info', {
             'fields': ('created_at',),
@@ -46,25 +51,57 @@ class VisitorAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.display(description="Photo")
+    def thumbnail(self, obj):
+        return _thumbnail_html(obj.photo_thumbnail_url)
+
+    @admin.display(description="ID preview")
+    def govt_id_thumbnail(self, obj):
+        return _thumbnail_html(obj.govt_id_thumbnail_url)
+
+
+def _thumbnail_html(url):
+    if not url:
+        return "—"
+    return format_html('<img src="{}" alt="" loading="lazy" width="48" height="48" style="object-fit:cover;border-radius:4px;">', url)
+
+
+class DurationFilter(admin.SimpleListFilter):
+    title = "duration"
+    parameter_name = "over_hours"
+
+    def lookups(self, request, model_admin):
+        return [(str(hours), f"Over {hours}h") for hours in (1, 2, 4, 8)]
+
+    def queryset(self, request, queryset):
+        if self.value() in {"1", "2", "4", "8"}:
+            return longer_than(queryset, int(self.value()) * 3600)
+        return queryset
+
 
 @admin.register(Visit)
 class VisitAdmin(admin.ModelAdmin):
     list_display = ("visitor", "employee", "status", "purpose", "started_at", "ended_at", "duration")
-    list_filter = ("status", "employee", "started_at", "ended_at")
+    list_filter = ("status", DurationFilter, "employee", "started_at", "ended_at")
     search_fields = ("visitor__full_name", "employee__name", "purpose")
     readonly_fields = ("started_at", "ended_at", "sms_sent_at")
     ordering = ("-started_at",)
-    
+
+    def get_queryset(self, request):
+        return with_elapsed(super().get_queryset(request))
+
+    @admin.display(description="Duration", ordering="elapsed_seconds")
     def duration(self, obj):
-        if obj.started_at and obj.ended_at:
-            duration = obj.ended_at - obj.started_at
-            hours, remainder = divmod(duration.total_seconds(), 3600)
-            minutes, _ = divmod(remainder, 60)
-            return f"{int(hours)}h {int(minutes)}m"
+        if obj.ended_at:
+            hours, remainder = divmod(obj.elapsed_seconds, 3600)
+            return f"{hours}h {remainder // 60}m"
         elif obj.started_at:
             return "Ongoing"
         return "-"
-    duration.short_description = "Duration"
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        publish_visit_event("updated" if change else "created", obj)
     
     fieldsets = (
         ('Visit Details', {
@@ -76,6 +113,22 @@ class VisitAdmin(admin.ModelAdmin):
     )
 
 
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display = ("recipient", "channel", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status", "channel")
+    search_fields = ("recipient", "subject", "provider_message_id")
+    readonly_fields = ("attempts", "locked_at", "last_error", "provider_message_id", "created_at", "sent_at")
+    raw_id_fields = ("visit",)
+    ordering = ("-created_at",)
+    actions = ("retry_now",)
+
+    @admin.action(description="Retry selected messages now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status="sent").update(status="pending", attempts=0, next_attempt_at=timezone.now())
+        self.message_user(request, f"{updated} message(s) queued for retry.")
+
+
 # Enhanced User Admin
 class CustomUserAdmin(BaseUserAdmin):
     list_display = ('username', 'email', 'first_name', 'last_name', 'is_staff', 'is_active', 'date_joined')
@@ -0,0 +1,9 @@
+"""
+Offline load testing for the kiosk and guard dashboard.
+
+``seed`` fills the database with synthetic employees, visitors and visits,
+``stubs`` replaces the Brevo and Fast2SMS network calls with fakes of a
+fixed latency, ``server`` runs the app under gunicorn with the Procfile's
+options and ``scenarios`` drives it over HTTP. ``manage.py loadtest`` ties
+them together.
+"""
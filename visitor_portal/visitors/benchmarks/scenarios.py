@@ -0,0 +1,185 @@
+import itertools
+import math
+import random
+import threading
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import requests
+from django.db import connection
+from django.utils import timezone
+
+from visitors.models import Employee
+
+from .seed import BENCH_PREFIX, GUARD_PASSWORD, SEARCH_TERMS, guard_username
+from .stubs import SentCodes
+
+
+AJAX = {"X-Requested-With": "XMLHttpRequest"}
+
+
+class Sample(NamedTuple):
+    step: str
+    seconds: float
+    ok: bool
+
+
+class StepStats(NamedTuple):
+    step: str
+    count: int
+    errors: int
+    p50: float
+    p95: float
+    p99: float
+
+
+class Report(NamedTuple):
+    scenario: str
+    users: int
+    seconds: float
+    requests: int
+    errors: int
+    steps: List[StepStats]
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.seconds if self.seconds else 0.0
+
+
+def percentile(ordered: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+class VirtualUser:
+    """One browser: its own cookies and connection, timing every request."""
+
+    def __init__(self, url: str, index: int, samples: List[Sample], lock: threading.Lock, guards: int = 8,
+                 codes: Optional[SentCodes] = None):
+        self.url = url.rstrip("/")
+        self.index = index
+        self.guards = guards
+        self.codes = codes
+        self.http = requests.Session()
+        self.samples = samples
+        self.lock = lock
+        self.state: Dict[str, object] = {}
+
+    def request(self, step: str, method: str, path: str, expect=(200,), ajax=False, **kwargs) -> Optional[requests.Response]:
+        headers = dict(AJAX) if ajax else {}
+        if method == "POST":
+            headers["X-CSRFToken"] = self.http.cookies.get("csrftoken", "")
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.url + path, headers=headers, allow_redirects=False, timeout=30, **kwargs)
+            ok = response.status_code in expect
+        except requests.RequestException:
+            response, ok = None, False
+        with self.lock:
+            self.samples.append(Sample(step, time.perf_counter() - started, ok))
+        return response if ok else None
+
+
+_kiosk_ids = itertools.count(1)
+
+
+def kiosk_checkin(user: VirtualUser) -> None:
+    """A visitor at the kiosk: intake page, OTP, submit, visit page, end visit."""
+    if "employees" not in user.state:
+        user.state["employees"] = list(Employee.objects.filter(name__startswith=BENCH_PREFIX, active=True).values_list("id", "name"))
+    n = next(_kiosk_ids)
+    email = f"{BENCH_PREFIX}kiosk-{user.index}-{n}@example.com"
+    if not user.request("intake page", "GET", "/"):
+        return
+    if not user.request("send otp", "POST", "/", ajax=True, data={"action": "send_otp", "email": email}):
+        return
+    # The code is only ever in the email, so read it from the stubbed provider
+    code = user.codes.get(email) if user.codes is not None else None
+    if not code:
+        return
+    employee_id, employee_name = random.choice(user.state["employees"])
+    response = user.request("check in", "POST", "/", expect=(302,), data={
+        "full_name": f"{BENCH_PREFIX}kiosk {n}", "email": email, "address": "Benchmark",
+        "phone": f"7{random.randrange(10 ** 9):09d}", "employee_name": employee_name, "employee_id": employee_id,
+        "purpose": "Load test", "otp": code,
+    })
+    if not response:
+        return
+    visit_path = response.headers["Location"]
+    user.request("visit page", "GET", visit_path)
+    user.request("end visit", "GET", visit_path.rstrip("/") + "/end/", expect=(302,))
+
+
+def _login_guard(user: VirtualUser) -> bool:
+    if user.state.get("logged_in"):
+        return True
+    user.request("login page", "GET", "/login/")
+    response = user.request("login", "POST", "/login/", expect=(302,), data={
+        "username": guard_username(user.index % user.guards), "password": GUARD_PASSWORD,
+    })
+    user.state["logged_in"] = bool(response)
+    return user.state["logged_in"]
+
+
+def guard_poll(user: VirtualUser) -> None:
+    """A guard's dashboard refreshing itself."""
+    if _login_guard(user):
+        user.request("dashboard poll", "GET", "/control/", ajax=True)
+
+
+def month_search(user: VirtualUser) -> None:
+    """A guard searching one month of visits."""
+    if not _login_guard(user):
+        return
+    months_back = random.randrange(12)
+    month = (timezone.now().replace(day=1) - timedelta(days=31 * months_back)).strftime("%Y-%m")
+    user.request("month search", "GET", "/control/", ajax=True,
+                 params={"search": random.choice(SEARCH_TERMS), "month": month})
+
+
+SCENARIOS: Dict[str, Callable[[VirtualUser], None]] = {
+    "checkin": kiosk_checkin,
+    "poll": guard_poll,
+    "search": month_search,
+}
+
+
+def run(url: str, scenario: str, users: int, seconds: float, think: float = 0.0, guards: int = 8,
+        codes: Optional[SentCodes] = None) -> Report:
+    """Run ``users`` virtual users through ``scenario`` for ``seconds``.
+
+    ``codes`` is where the server's stubbed Brevo records OTP codes; the
+    check-in scenario cannot get past the OTP without it.
+    """
+    action = SCENARIOS[scenario]
+    samples: List[Sample] = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def loop(index: int):
+        user = VirtualUser(url, index, samples, lock, guards, codes)
+        try:
+            while time.monotonic() < deadline:
+                action(user)
+                if think:
+                    time.sleep(random.expovariate(1 / think))
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=loop, args=(i,), name=f"{scenario}-{i}") for i in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    steps = []
+    for step in dict.fromkeys(sample.step for sample in samples):
+        timings = sorted(s.seconds for s in samples if s.step == step)
+        errors = sum(1 for s in samples if s.step == step and not s.ok)
+        steps.append(StepStats(step, len(timings), errors, *(percentile(timings, p) for p in (50, 95, 99))))
+    return Report(scenario, users, elapsed, len(samples), sum(1 for s in samples if not s.ok), steps)
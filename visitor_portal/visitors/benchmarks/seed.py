@@ -0,0 +1,98 @@
+import random
+import time
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.contrib.auth.models import Group, User
+from django.utils import timezone
+
+from visitors.models import Employee, OutboundMessage, Visitor, Visit
+from visitors.roles import GUARD_GROUP
+
+
+BENCH_PREFIX = "bench-"
+GUARD_PASSWORD = "bench-guard-password"
+SEARCH_TERMS = ("Kumar", "Rao", "Delivery", "Interview", "Sales")
+_SURNAMES = ("Kumar", "Rao", "Sharma", "Iyer", "Das", "Singh", "Khan", "Menon")
+_PURPOSES = ("Delivery", "Interview", "Meeting", "Sales", "Maintenance")
+
+
+class SeedResult(NamedTuple):
+    employees: int
+    visitors: int
+    visits: int
+    seconds: float
+
+
+def guard_username(i: int) -> str:
+    return f"{BENCH_PREFIX}guard-{i}"
+
+
+def seed(employees: int = 200, visitors: int = 5000, visits: int = 50000, guards: int = 8,
+         ongoing_ratio: float = 0.01, days: int = 365, rng_seed: int = 42) -> SeedResult:
+    """Insert synthetic rows; the same arguments always give the same data."""
+    started = time.perf_counter()
+    rnd = random.Random(rng_seed)
+    Employee.objects.bulk_create(
+        [Employee(name=f"{BENCH_PREFIX}{rnd.choice(_SURNAMES)} {i}", phone=f"98{i:08d}", department=f"Dept {i % 20}")
+         for i in range(employees)],
+        batch_size=1000,
+    )
+    # bulk_create skips the signal that fills phone_normalized, so set it here
+    Visitor.objects.bulk_create(
+        [Visitor(full_name=f"{BENCH_PREFIX}{rnd.choice(_SURNAMES)} {i}", phone=f"+919{i:09d}", phone_normalized=f"+919{i:09d}",
+                 email=f"{BENCH_PREFIX}visitor-{i}@example.com", address="Benchmark")
+         for i in range(visitors)],
+        batch_size=1000,
+    )
+    employee_ids = list(Employee.objects.filter(name__startswith=BENCH_PREFIX).values_list("id", flat=True))
+    visitor_ids = list(Visitor.objects.filter(full_name__startswith=BENCH_PREFIX).values_list("id", flat=True))
+
+    now = timezone.now()
+    span = int(timedelta(days=days).total_seconds())
+    batch = []
+    for i in range(visits):
+        started_at = now - timedelta(seconds=rnd.randint(0, span))
+        if rnd.random() < ongoing_ratio:
+            ended_at, status = None, "ongoing"
+        else:
+            ended_at, status = started_at + timedelta(minutes=rnd.randint(5, 240)), "ended"
+        batch.append(Visit(
+            visitor_id=rnd.choice(visitor_ids), employee_id=rnd.choice(employee_ids),
+            purpose=rnd.choice(_PURPOSES), started_at=started_at, ended_at=ended_at, status=status,
+        ))
+        if len(batch) >= 5000:
+            _insert_visits(batch)
+            batch = []
+    if batch:
+        _insert_visits(batch)
+
+    group, _ = Group.objects.get_or_create(name=GUARD_GROUP)
+    for i in range(guards):
+        user, created = User.objects.get_or_create(username=guard_username(i))
+        if created:
+            user.set_password(GUARD_PASSWORD)
+            user.save()
+        user.groups.add(group)
+    return SeedResult(employees, visitors, visits, time.perf_counter() - started)
+
+
+def _insert_visits(batch):
+    from visitors.search import build_search_document, get_search_backend
+
+    # bulk_create skips the search signals, so index the rows directly
+    related = {v.id: v for v in Visitor.objects.filter(id__in={visit.visitor_id for visit in batch})}
+    employees = {e.id: e for e in Employee.objects.filter(id__in={visit.employee_id for visit in batch})}
+    for visit in batch:
+        visit.visitor, visit.employee = related[visit.visitor_id], employees[visit.employee_id]
+        visit.search_document = build_search_document(visit)
+    get_search_backend().index(Visit.objects.bulk_create(batch))
+
+
+def cleanup() -> int:
+    """Delete every synthetic row, including visits made by the scenarios."""
+    deleted = Visitor.objects.filter(full_name__startswith=BENCH_PREFIX).delete()[0]
+    deleted += Employee.objects.filter(name__startswith=BENCH_PREFIX).delete()[0]
+    deleted += User.objects.filter(username__startswith=BENCH_PREFIX).delete()[0]
+    deleted += OutboundMessage.objects.filter(recipient__startswith=BENCH_PREFIX).delete()[0]
+    return deleted
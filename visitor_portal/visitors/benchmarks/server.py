@@ -0,0 +1,97 @@
+import multiprocessing
+import shlex
+import shutil
+import tempfile
+import time
+from typing import Dict, Optional
+
+import requests
+from django.conf import settings
+from django.db import connections
+from django.test import override_settings
+from gunicorn.app.base import BaseApplication
+
+from .stubs import SentCodes, stub_providers
+
+
+# Procfile flags passed on to gunicorn; --bind is chosen by the load test
+_INT_OPTIONS = {"workers", "threads", "timeout"}
+_OPTIONS = _INT_OPTIONS | {"worker_class"}
+
+
+def procfile_options(path: Optional[str] = None) -> Dict[str, object]:
+    """The gunicorn settings of the Procfile's ``web`` process."""
+    path = path or settings.BASE_DIR.parent / "Procfile"
+    with open(path) as f:
+        line = next(line for line in f if line.startswith("web:"))
+    args = shlex.split(line.split(":", 1)[1])
+    args = args[args.index("gunicorn") + 2:]  # past the WSGI module
+    options = {}
+    for flag, value in zip(args, args[1:]):
+        name = flag.lstrip("-").replace("-", "_")
+        if flag.startswith("--") and name in _OPTIONS:
+            options[name] = int(value) if name in _INT_OPTIONS else value
+    return options
+
+
+class _Gunicorn(BaseApplication):
+    def __init__(self, options):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for name, value in self.options.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        from django.core.wsgi import get_wsgi_application
+        return get_wsgi_application()
+
+
+def _serve(options, latency, codes):
+    # One IP sends every request, so the per-IP OTP limits are off
+    with stub_providers(latency, codes), override_settings(
+        OTP_SENDS_PER_IP=0, OTP_VERIFIES_PER_IP=0,
+        ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ["127.0.0.1", "localhost"],
+    ):
+        _Gunicorn(options).run()
+
+
+class Server:
+    """gunicorn with the Procfile's options and stubbed providers, in a child process."""
+
+    def __init__(self, bind: str = "127.0.0.1:8765", latency: float = 0.05, options: Optional[dict] = None):
+        self.bind = bind
+        self.url = f"http://{bind}"
+        self.options = {**(options or procfile_options()), "bind": bind, "loglevel": "warning"}
+        self.latency = latency
+        self.process = None
+        self.codes = None  # OTP codes the stubbed Brevo sent, for kiosk scenarios
+
+    def __enter__(self):
+        self.codes = SentCodes(tempfile.mkdtemp(prefix="loadtest-otp-"))
+        # The child must not share the parent's database connections
+        connections.close_all()
+        self.process = multiprocessing.get_context("fork").Process(target=_serve, args=(self.options, self.latency, self.codes))
+        self.process.start()
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            try:
+                if requests.get(f"{self.url}/health/", timeout=1).status_code == 200:
+                    return self
+            except requests.RequestException:
+                pass
+            if not self.process.is_alive():
+                break
+            time.sleep(0.2)
+        self.__exit__(None, None, None)
+        raise RuntimeError(f"gunicorn did not start on {self.bind}")
+
+    def __exit__(self, *exc):
+        if self.process is not None and self.process.is_alive():
+            self.process.terminate()
+            self.process.join(10)
+        self.process = None
+        if self.codes is not None:
+            shutil.rmtree(self.codes.directory, ignore_errors=True)
+            self.codes = None
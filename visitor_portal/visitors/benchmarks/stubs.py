@@ -0,0 +1,83 @@
+import hashlib
+import itertools
+import os
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Optional
+from unittest import mock
+
+from django.test import override_settings
+
+
+_CODE_RE = re.compile(r"verification code is (\d{6})")
+
+
+class SentCodes:
+    """OTP codes the stubbed Brevo client delivered, by recipient.
+
+    Kept as one file per recipient in ``directory`` so the gunicorn workers
+    that send and the load-test process that reads need share nothing else.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def _path(self, recipient: str) -> Path:
+        return self.directory / hashlib.sha256(recipient.strip().lower().encode()).hexdigest()
+
+    def record(self, recipient: str, code: str) -> None:
+        path = self._path(recipient)
+        temp = path.with_name(f".{path.name}.{os.getpid()}")
+        temp.write_text(code)
+        os.replace(temp, path)
+
+    def get(self, recipient: str) -> Optional[str]:
+        try:
+            return self._path(recipient).read_text()
+        except FileNotFoundError:
+            return None
+
+
+class _StubBrevo:
+    def __init__(self, latency: float, codes: Optional[SentCodes] = None):
+        self.latency = latency
+        self.codes = codes
+        self.ids = itertools.count(1)
+
+    def send_transac_email(self, email, _request_timeout=None):
+        time.sleep(self.latency)
+        match = _CODE_RE.search(email.text_content or "")
+        if match and self.codes is not None:
+            for recipient in email.to:
+                self.codes.record(recipient["email"], match.group(1))
+        return SimpleNamespace(message_id=f"<stub-{next(self.ids)}@brevo>")
+
+
+class _StubFast2SMS:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.ids = itertools.count(1)
+
+    def post(self, url, json=None, headers=None, timeout=None):
+        time.sleep(self.latency)
+        body = {"return": True, "request_id": f"stub-{next(self.ids)}"}
+        return SimpleNamespace(status_code=200, json=lambda: body)
+
+
+@contextmanager
+def stub_providers(latency: float = 0.05, codes: Optional[SentCodes] = None):
+    """Swap the Brevo client and the Fast2SMS HTTP session for local fakes.
+
+    Only the network call is replaced: the outbox, circuit breakers and
+    provider metrics all run for real, and every send takes ``latency``
+    seconds. OTP codes emailed by the fake are recorded in ``codes``.
+    """
+    credentials = {"FAST2SMS_API_KEY": "stub", "WHATSAPP_API_KEY": "stub", "WHATSAPP_INSTANCE_ID": "stub", "WHATSAPP_TOKEN": "stub"}
+    with mock.patch("visitors.email.get_brevo_api", return_value=_StubBrevo(latency, codes)), \
+            mock.patch("visitors.sms._get_session", return_value=_StubFast2SMS(latency)), \
+            mock.patch.dict(os.environ, credentials), \
+            override_settings(BREVO_API_KEY="stub"):
+        yield
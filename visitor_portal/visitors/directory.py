@@ -0,0 +1,241 @@
+import bisect
+import hashlib
+import json
+import re
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, Max
+
+from .models import Employee
+
+
+_GENERATION_KEY = "visitors:employee_directory:generation"
+_PAYLOAD_KEY = "visitors:employee_directory:payload:v2:{generation}"
+
+
+class EmployeeDirectory(NamedTuple):
+    """Snapshot of the active employees shown on the intake page.
+
+    ``version`` is a digest of the payload, so it is identical across
+    processes and only changes when the visible data changes.
+    """
+    generation: int
+    stamp: Optional[Tuple]
+    version: str
+    employees: List[dict]
+
+
+_lock = threading.Lock()
+_generation = 1
+_directory: Optional[EmployeeDirectory] = None
+_stamp_checked = 0.0  # time.monotonic() of the last table stamp read
+_index: Optional["EmployeeIndex"] = None
+
+_TOKEN_RE = re.compile(r"\w+")
+
+
+def _shared_cache():
+    """Return the shared cache configured via EMPLOYEE_DIRECTORY_CACHE, if any."""
+    alias = getattr(settings, "EMPLOYEE_DIRECTORY_CACHE", "")
+    return caches[alias] if alias else None
+
+
+def _current_generation(cache) -> int:
+    if cache is None:
+        return _generation
+    generation = cache.get(_GENERATION_KEY)
+    if generation is None:
+        # Seed with a timestamp so a flushed cache never reuses an old generation
+        cache.add(_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(_GENERATION_KEY, 0)
+    return generation
+
+
+def _db_stamp() -> Tuple:
+    """Row count and latest change of the (small) employee table, in one aggregate.
+
+    Any create, edit or delete changes it, whichever process made the change.
+    """
+    stamp = Employee.objects.aggregate(count=Count("id"), changed=Max("updated_at"))
+    return stamp["count"], stamp["changed"]
+
+
+def _build(generation: int, stamp: Optional[Tuple]) -> EmployeeDirectory:
+    employees = list(
+        Employee.objects.filter(active=True).order_by("name").values("id", "name", "department")
+    )
+    payload = json.dumps(employees, separators=(",", ":")).encode("utf-8")
+    version = hashlib.sha1(payload).hexdigest()[:12]
+    return EmployeeDirectory(generation, stamp, version, employees)
+
+
+def get_employee_directory() -> EmployeeDirectory:
+    """Return the cached active-employee directory, rebuilding it if stale.
+
+    The directory lives in process memory. Without ``EMPLOYEE_DIRECTORY_CACHE``
+    a stamp of the employee table is compared at most once every
+    ``EMPLOYEE_DIRECTORY_STAMP_SECONDS``, so changes made by another process
+    (``import_employees``, a second worker) are seen within that delay and
+    reads in between cost no query; changes made in this process are seen
+    at once. When it names a shared cache alias, the generation counter
+    and payload live in that cache instead and no query is needed.
+    """
+    global _directory, _stamp_checked
+    cache = _shared_cache()
+    generation = _current_generation(cache)
+    directory = _directory
+    stamp = None
+    if cache is None:
+        interval = getattr(settings, "EMPLOYEE_DIRECTORY_STAMP_SECONDS", 5)
+        if directory is not None and directory.generation == generation and time.monotonic() - _stamp_checked < interval:
+            return directory
+        stamp = _db_stamp()
+        _stamp_checked = time.monotonic()
+    if directory is not None and (directory.generation, directory.stamp) == (generation, stamp):
+        return directory
+
+    with _lock:
+        directory = _directory
+        if directory is not None and (directory.generation, directory.stamp) == (generation, stamp):
+            return directory
+        directory = None
+        if cache is not None:
+            directory = cache.get(_PAYLOAD_KEY.format(generation=generation))
+        if directory is None:
+            directory = _build(generation, stamp)
+            if cache is not None:
+                cache.set(_PAYLOAD_KEY.format(generation=generation), directory, None)
+        _directory = directory
+    return directory
+
+
+def invalidate_employee_directory() -> None:
+    """Mark the directory stale; it is rebuilt lazily on the next read."""
+    global _generation, _directory
+    with _lock:
+        _generation += 1
+        _directory = None
+    cache = _shared_cache()
+    if cache is not None:
+        try:
+            cache.incr(_GENERATION_KEY)
+        except ValueError:
+            cache.add(_GENERATION_KEY, time.time_ns(), None)
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").casefold())
+
+
+def _trigrams(tokens: List[str]) -> Set[str]:
+    grams = set()
+    for token in tokens:
+        padded = f"  {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class EmployeeIndex:
+    """In-memory typeahead index over employee name and department.
+
+    Word prefixes are resolved with a sorted token array (a flattened prefix
+    trie searched with ``bisect``); queries that match no prefix fall back to
+    trigram similarity so typos and infix fragments still find someone.
+    """
+
+    # Ranking tiers, lowest first
+    EXACT, NAME_PREFIX, NAME_WORDS, ANY_WORDS, SIMILAR = range(5)
+
+    def __init__(self, employees: List[dict], version: str = ""):
+        self.employees = employees
+        self.version = version
+        self._names = [" ".join(_tokens(e["name"])) for e in employees]
+        self._name_tokens: List[Set[str]] = []
+        entries = []
+        self._grams: Dict[str, List[int]] = {}
+        for idx, employee in enumerate(employees):
+            name_tokens = _tokens(employee["name"])
+            all_tokens = name_tokens + _tokens(employee["department"])
+            self._name_tokens.append(set(name_tokens))
+            entries.extend((token, idx) for token in set(all_tokens))
+            grams = _trigrams(all_tokens)
+            for gram in grams:
+                self._grams.setdefault(gram, []).append(idx)
+        entries.sort()
+        self._keys = [token for token, _ in entries]
+        self._ids = [idx for _, idx in entries]
+        self._by_name: Dict[str, int] = {}
+        for idx, name in enumerate(self._names):
+            self._by_name.setdefault(name, idx)
+
+    def _prefix_matches(self, prefix: str) -> Set[int]:
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + "\U0010ffff", lo)
+        return set(self._ids[lo:hi])
+
+    def _similar(self, tokens: List[str]) -> Dict[int, float]:
+        grams = _trigrams(tokens)
+        if not grams:
+            return {}
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+        # Share of the query's trigrams found anywhere in the employee's words
+        return {idx: common / len(grams) for idx, common in shared.items() if common / len(grams) >= 0.5}
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """Return up to ``limit`` employees ranked by how well they match."""
+        query_tokens = _tokens(query)
+        if not query_tokens:
+            return self.employees[:limit]
+        needle = " ".join(query_tokens)
+
+        candidates: Optional[Set[int]] = None
+        for token in query_tokens:
+            matches = self._prefix_matches(token)
+            candidates = matches if candidates is None else candidates & matches
+            if not candidates:
+                break
+
+        ranked = []
+        if candidates:
+            for idx in candidates:
+                name = self._names[idx]
+                if name == needle:
+                    tier = self.EXACT
+                elif name.startswith(needle):
+                    tier = self.NAME_PREFIX
+                elif all(any(t.startswith(q) for t in self._name_tokens[idx]) for q in query_tokens):
+                    tier = self.NAME_WORDS
+                else:
+                    tier = self.ANY_WORDS
+                ranked.append((tier, 0.0, name, idx))
+        else:
+            for idx, score in self._similar(query_tokens).items():
+                ranked.append((self.SIMILAR, -score, self._names[idx], idx))
+
+        return [self.employees[idx] for *_, idx in sorted(ranked)[:limit]]
+
+    def resolve(self, name: str) -> Optional[dict]:
+        """Return the employee called ``name``, or the only typeahead match."""
+        idx = self._by_name.get(" ".join(_tokens(name)))
+        if idx is not None:
+            return self.employees[idx]
+        matches = self.search(name, limit=2)
+        return matches[0] if len(matches) == 1 else None
+
+
+def get_employee_index() -> EmployeeIndex:
+    """Return the typeahead index for the current employee directory."""
+    global _index
+    directory = get_employee_directory()
+    index = _index
+    if index is None or index.version != directory.version:
+        index = EmployeeIndex(directory.employees, directory.version)
+        _index = index
+    return index
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.db.models import BigIntegerField, F, Func, Q, QuerySet
+from django.db.models.functions import Coalesce, Now
+from django.utils import timezone
+
+
+class SecondsBetween(Func):
+    """Whole seconds from one datetime expression to a later one, in SQL.
+
+    Deterministic for column arguments, so it can back a stored generated
+    column as well as an annotation.
+    """
+
+    arity = 2
+    output_field = BigIntegerField()
+
+    def _operands(self, compiler, connection):
+        (start_sql, start_params), (end_sql, end_params) = (compiler.compile(e) for e in self.get_source_expressions())
+        return start_sql, end_sql, [*start_params, *end_params]
+
+    def as_sql(self, compiler, connection, **extra_context):
+        start, end, params = self._operands(compiler, connection)
+        # timestamptz - timestamptz is an interval; EXTRACT(EPOCH) of it is immutable
+        return f"FLOOR(EXTRACT(EPOCH FROM ({end} - {start})))::bigint", params
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        start, end, params = self._operands(compiler, connection)
+        # julianday() is a double; rounding to the millisecond first keeps
+        # whole-second spans from truncating to one second less
+        return f"CAST(ROUND((julianday({end}) - julianday({start})) * 86400000) / 1000 AS INTEGER)", params
+
+    def as_mysql(self, compiler, connection, **extra_context):
+        start, end, params = self._operands(compiler, connection)
+        return f"TIMESTAMPDIFF(SECOND, {start}, {end})", params
+
+
+def with_elapsed(queryset: QuerySet) -> QuerySet:
+    """Annotate visits with ``elapsed_seconds``: the stored duration once
+    ended, the time on site so far otherwise."""
+    return queryset.annotate(
+        elapsed_seconds=Coalesce(F("ended_duration_seconds"), SecondsBetween(F("started_at"), Now())),
+    )
+
+
+def longer_than(queryset: QuerySet, seconds: int) -> QuerySet:
+    """Visits that lasted, or have been running for, at least ``seconds``.
+
+    Written against the indexed columns rather than ``elapsed_seconds`` so
+    the database can use the duration and start-time indexes.
+    """
+    started_before = timezone.now() - timedelta(seconds=seconds)
+    return queryset.filter(
+        Q(ended_duration_seconds__gte=seconds) | Q(ended_at__isnull=True, started_at__lte=started_before)
+    )
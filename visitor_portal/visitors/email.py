@@ -1,94 +1,154 @@
-import os
 import threading
 from typing import Optional
 from django.conf import settings
 
+from .metrics import observe_provider
+
+
+_brevo_lock = threading.Lock()
+_brevo_api = None  # (settings key, TransactionalEmailsApi)
+
+
+def build_brevo_api(api_key: str, host: str = "", pool_size: int = 4):
+    """Create a Brevo transactional email client with its own connection pool."""
+    from sib_api_v3_sdk import ApiClient, Configuration, TransactionalEmailsApi
+
+    configuration = Configuration()
+    configuration.api_key['api-key'] = api_key
+    if host:
+        configuration.host = host
+    # Connections kept alive per host; sends beyond this open throwaway connections
+    configuration.connection_pool_maxsize = pool_size
+    return TransactionalEmailsApi(ApiClient(configuration))
+
+
+def get_brevo_api():
+    """Return the process-wide Brevo client, creating it on first use.
+
+    The SDK client wraps a thread-safe urllib3 pool, so sharing it lets
+    consecutive sends reuse a kept-alive HTTPS connection instead of paying
+    for a new TCP and TLS handshake each time. It is rebuilt if the Brevo
+    settings change.
+    """
+    global _brevo_api
+    key = (settings.BREVO_API_KEY, settings.BREVO_API_HOST, settings.BREVO_CONNECTION_POOL_SIZE)
+    cached = _brevo_api
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    with _brevo_lock:
+        if _brevo_api is None or _brevo_api[0] != key:
+            _brevo_api = (key, build_brevo_api(*key))
+        return _brevo_api[1]
+
+
+def deliver_email(to_email: str, subject: str, message: str, api=None, timeout: Optional[float] = None) -> str:
+    """Send one email through the Brevo API.
+
+    Called by the outbox worker. Returns the Brevo message id and raises on
+    any failure so the message is retried; ValueError means the message
+    itself was rejected and should not be. ``timeout`` defaults to
+    BREVO_TIMEOUT.
+    """
+    from sib_api_v3_sdk import SendSmtpEmail, SendSmtpEmailSender
+    from sib_api_v3_sdk.rest import ApiException
+
+    if not settings.BREVO_API_KEY:
+        raise RuntimeError("BREVO_API_KEY not set")
+
+    # Prepare email
+    sender = SendSmtpEmailSender(email=settings.DEFAULT_FROM_EMAIL, name="Eterna Visitor Management")
+    send_smtp_email = SendSmtpEmail(
+        sender=sender,
+        to=[{"email": to_email.strip()}],
+        subject=subject,
+        text_content=message
+    )
 
-def _send_email_async(to_email: str, subject: str, message: str):
-    """Send email in background thread using Brevo API."""
     try:
-        from sib_api_v3_sdk import TransactionalEmailsApi, SendSmtpEmail, SendSmtpEmailSender
-        from sib_api_v3_sdk.rest import ApiException
-        from sib_api_v3_sdk.configuration import Configuration
-        
-        api_key = settings.BREVO_API_KEY
-        if not api_key:
-            print(f"❌ BREVO_API_KEY not set - email not sent to {to_email}")
-            return
-        
-        # Configure Brevo API
-        configuration = Configuration()
-        configuration.api_key['api-key'] = api_key
-        
-        api_instance = TransactionalEmailsApi()
-        api_instance.api_client.configuration = configuration
-        
-        # Prepare email
-        sender = SendSmtpEmailSender(email=settings.DEFAULT_FROM_EMAIL, name="Eterna Visitor Management")
-        send_smtp_email = SendSmtpEmail(
-            sender=sender,
-            to=[{"email": to_email.strip()}],
-            subject=subject,
-            text_content=message
-        )
-        
-        # Send email
-        api_response = api_instance.send_transac_email(send_smtp_email)
-        print(f"✅ Email sent successfully to {to_email} via Brevo (Message ID: {api_response.message_id})")
-            
+        with observe_provider("brevo"):
+            api_response = (api or get_brevo_api()).send_transac_email(
+                send_smtp_email, _request_timeout=timeout or settings.BREVO_TIMEOUT
+            )
     except ApiException as e:
-        print(f"❌ Email sending FAILED to {to_email}: {e.status} - {e.body}")
-    except Exception as e:
-        print(f"❌ Email sending FAILED to {to_email}: {str(e)}")
-        print(f"   FROM: {settings.DEFAULT_FROM_EMAIL}")
+        if e.status in (400, 404, 422):
+            # Rejected address or payload; retrying would get the same answer
+            raise ValueError(f"Brevo {e.status}: {e.body}") from e
+        raise RuntimeError(f"Brevo {e.status}: {e.body}") from e
+    return api_response.message_id
 
 
-def send_email_notification(to_email: str, subject: str, message: str) -> Optional[str]:
-    """Send email notification (non-blocking).
+def send_email_notification(to_email: str, subject: str, message: str, visit=None, max_attempts: Optional[int] = None) -> Optional[str]:
+    """Queue an email notification (non-blocking).
     
     Args:
         to_email: Email address to send to
         subject: Email subject
         message: Email body content
+        visit: Visit the notification is about, if any
+        max_attempts: Override how many times delivery is tried
     
     Returns:
-        'sent' immediately (email sends in background)
+        'queued' once the message is stored in the outbox, None if there is no address
     """
     if not to_email or not to_email.strip():
         return None
-    
-    # Send email in background thread so request returns immediately
-    thread = threading.Thread(
-        target=_send_email_async,
-        args=(to_email.strip(), subject, message),
-        daemon=True
-    )
-    thread.start()
-    
-    # Return immediately - email sending happens in background
-    return 'sent'
+
+    from .outbox import enqueue_message
+
+    # The outbox row survives restarts; delivery happens after commit and is
+    # retried by `manage.py run_outbox` if it fails
+    enqueue_message("email", to_email.strip(), message, subject=subject, visit=visit, max_attempts=max_attempts)
+    return 'queued'
 
 
 def send_otp_email(to_email: str, otp_code: str) -> Optional[str]:
-    """Send OTP via email.
-    
+    """Send OTP via email, synchronously and outside the outbox.
+
+    The code must never be stored, so it is handed straight to Brevo and
+    nothing is written to the database. Failures are reported to the
+    kiosk instead of retried: the visitor simply asks for a new code.
+    The kiosk waits on this call, so it is bounded by OTP_EMAIL_TIMEOUT.
+
     Args:
         to_email: Visitor email address
         otp_code: 6-digit OTP code
-    
+
     Returns:
-        'sent' if successful, None otherwise
+        The Brevo message id once accepted, None if the address was
+        rejected, Brevo failed or its circuit is open
     """
+    from .outbox import get_breaker
+
+    if not to_email or not to_email.strip():
+        return None
     subject = "Your Verification Code"
+    minutes = max(1, getattr(settings, "OTP_TTL_SECONDS", 300) // 60)
     message = (
         f"Your verification code is {otp_code}. "
-        f"This code will expire in 5 minutes. "
+        f"This code will expire in {minutes} minutes. "
         f"\n\nIf you did not request this code, please ignore this email."
     )
-    return send_email_notification(to_email, subject, message)
+    # Shares the outbox's email breaker, so a Brevo outage fails fast here too
+    breaker = get_breaker("email")
+    if not breaker.allow():
+        print(f"⚠️ OTP email to {to_email} not sent: email circuit open")
+        return None
+    try:
+        message_id = deliver_email(to_email, subject, message, timeout=getattr(settings, "OTP_EMAIL_TIMEOUT", 1))
+    except ValueError as e:
+        # Brevo answered; only this address or payload is bad
+        breaker.record_success()
+        print(f"❌ OTP email to {to_email} rejected: {e}")
+        return None
+    except Exception as e:
+        breaker.record_failure()
+        print(f"❌ OTP email to {to_email} failed: {e}")
+        return None
+    breaker.record_success()
+    return message_id or "sent"
 
 
-def send_visitor_notification_email(to_email: str, visitor_name: str, visitor_phone: str, purpose: str) -> Optional[str]:
+def send_visitor_notification_email(to_email: str, visitor_name: str, visitor_phone: str, purpose: str, visit=None) -> Optional[str]:
     """Send email notification to employee about visitor arrival.
     
     Args:
@@ -96,9 +156,10 @@ def send_visitor_notification_email(to_email: str, visitor_name: str, visitor_ph
         visitor_name: Name of the visitor
         visitor_phone: Phone number of the visitor
         purpose: Purpose of the visit
+        visit: Visit whose ``sms_sent_at`` is set once the email is delivered
     
     Returns:
-        'sent' if successful, None otherwise
+        'queued' if stored for delivery, None otherwise
     """
     subject = f"Visitor Alert: {visitor_name} has arrived"
     message = (
@@ -106,5 +167,5 @@ def send_visitor_notification_email(to_email: str, visitor_name: str, visitor_ph
         f"for {purpose}."
         f"\n\nPlease proceed to the reception area to meet your visitor."
     )
-    return send_email_notification(to_email, subject, message)
+    return send_email_notification(to_email, subject, message, visit=visit)
 
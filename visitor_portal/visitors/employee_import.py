@@ -0,0 +1,247 @@
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .directory import invalidate_employee_directory
+from .models import Employee, Visit
+from .phones import normalize_phones
+from .search import refresh_search_documents
+
+
+# Fields an import may change on an existing employee; the name too when
+# rows are matched by employee_code
+UPDATE_FIELDS = ("department", "phone", "email", "active")
+KEYS = ("name", "employee_code")
+TRUE_VALUES = ("", "1", "true", "yes", "y")
+
+SEEN_TABLE = "visitors_import_seen"
+
+
+class EmployeeChange(NamedTuple):
+    action: str  # "create", "update" or "deactivate"
+    name: str
+    fields: Dict[str, Tuple]  # field -> (old, new)
+
+
+class ImportResult(NamedTuple):
+    rows: int
+    created: int
+    updated: int
+    unchanged: int
+    deactivated: int
+    invalid: int
+    duplicates: int
+    queries: int
+    seconds: float
+    changes: List[EmployeeChange]
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _parse(row: dict, phone: Optional[str], key: str) -> Optional[dict]:
+    values = {
+        'name': (row.get('name') or '').strip(),
+        'department': (row.get('department') or '').strip(),
+        'phone': phone,
+        'email': (row.get('email') or '').strip(),
+        'active': (row.get('active') or '').strip().lower() in TRUE_VALUES,
+    }
+    if key == 'employee_code':
+        values['employee_code'] = (row.get('employee_code') or '').strip()
+    if not values['name'] or not values[key] or not phone:
+        return None
+    return values
+
+
+def _diff(employee: Employee, values: dict, fields: Sequence[str]) -> Dict[str, Tuple]:
+    changed = {}
+    for field in fields:
+        new = values[field]
+        # A blank email in the feed never clears one set by hand
+        if field == 'email' and not new:
+            continue
+        old = getattr(employee, field)
+        if old != new:
+            changed[field] = (old, new)
+    return changed
+
+
+def _missing_employees(key: str, seen: Iterable[str], deactivate: bool, chunk_size: int,
+                       now: datetime) -> List[Tuple[int, str]]:
+    """Find (and optionally deactivate) active employees whose key was not seen.
+
+    The seen keys go into a temporary table so the database computes the
+    set difference with an anti-join, instead of receiving a NOT IN list
+    with one parameter per employee.
+    """
+    qn = connection.ops.quote_name
+    table = qn(Employee._meta.db_table)
+    column = f"{table}.{qn(Employee._meta.get_field(key).column)}"
+    missing = (
+        f"{table}.{qn('active')} = %s AND NOT EXISTS "
+        f"(SELECT 1 FROM {SEEN_TABLE} s WHERE s.seen_key = {column})"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {SEEN_TABLE}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {SEEN_TABLE} (seen_key varchar(120) PRIMARY KEY)")
+        try:
+            seen = iter(seen)
+            while True:
+                keys = list(islice(seen, chunk_size))
+                if not keys:
+                    break
+                placeholders = ", ".join(["(%s)"] * len(keys))
+                cursor.execute(f"INSERT INTO {SEEN_TABLE} (seen_key) VALUES {placeholders}", keys)
+            cursor.execute(f"SELECT {table}.{qn('id')}, {table}.{qn('name')} FROM {table} WHERE {missing}", [True])
+            rows = cursor.fetchall()
+            if rows and deactivate:
+                cursor.execute(
+                    f"UPDATE {table} SET {qn('active')} = %s, {qn('updated_at')} = %s WHERE {missing}",
+                    [False, now, True],
+                )
+        finally:
+            cursor.execute(f"DROP TABLE {SEEN_TABLE}")
+    return rows
+
+
+def import_employees(rows: Iterable[dict], key: str = 'name', deactivate_missing: bool = False,
+                     dry_run: bool = False, chunk_size: int = 1000) -> ImportResult:
+    """Create or update employees from CSV rows matched on ``key``.
+
+    ``key`` is ``employee_code`` when the feed carries HR ids (unique, so
+    re-running an import is idempotent) or ``name`` for older files. On a
+    coded feed, employees that have no code yet are matched by name and
+    given theirs, so the first coded import does not duplicate them.
+    Existing employees are loaded into a key map once, then rows are read
+    ``chunk_size`` at a time and applied with ``bulk_create`` and
+    ``bulk_update``, all in one transaction, so the number of queries grows
+    with the number of chunks rather than rows. A later row for the same
+    key wins, as it did with the per-row import. With ``dry_run`` nothing
+    is written and the returned changes describe what would happen.
+    """
+    if key not in KEYS:
+        raise ValueError(f"Unknown import key: {key}")
+    fields = UPDATE_FIELDS + (('name',) if key == 'employee_code' else ())
+    # An adopted employee gets their code along with the other fields
+    diff_fields = fields + (('employee_code',) if key == 'employee_code' else ())
+    # bulk_update skips auto_now, and updated_at feeds the directory stamp
+    write_fields = diff_fields + ('updated_at',)
+    now = timezone.now()
+    started = time.perf_counter()
+    queries = [0]
+
+    def count_queries(execute, sql, params, many, context):
+        queries[0] += 1
+        return execute(sql, params, many, context)
+
+    counts = dict.fromkeys(("rows", "created", "updated", "unchanged", "deactivated", "invalid", "duplicates"), 0)
+    changes: List[EmployeeChange] = []
+    seen = set()
+    skipped = set()  # keys of invalid rows
+    adopted_ids = set()
+    refresh_ids = set()
+
+    with connection.execute_wrapper(count_queries), transaction.atomic():
+        existing: Dict[str, Employee] = {}
+        # Employees from before employee_code, by name (oldest first); a coded
+        # feed adopts them instead of creating duplicates
+        uncoded: Dict[str, List[Employee]] = {}
+        # Duplicate names already in the table: the oldest row is the one updated
+        for employee in Employee.objects.order_by('-pk').iterator(chunk_size=2000):
+            value = getattr(employee, key)
+            if value is None:
+                uncoded.setdefault(employee.name, []).insert(0, employee)
+            else:
+                existing[value] = employee
+
+        for chunk in _chunks(rows, chunk_size):
+            counts['rows'] += len(chunk)
+            phones = normalize_phones(row.get('phone') or '' for row in chunk)
+            to_create: Dict[str, Employee] = {}
+            to_update: Dict[int, Employee] = {}
+            for row, phone in zip(chunk, phones):
+                values = _parse(row, phone, key)
+                if values is None:
+                    counts['invalid'] += 1
+                    # Still in the feed: a bad phone must not get someone deactivated
+                    row_key = (row.get(key) or '').strip()
+                    if row_key:
+                        skipped.add(row_key)
+                    continue
+                row_key = values[key]
+                if row_key in seen:
+                    counts['duplicates'] += 1
+                seen.add(row_key)
+
+                employee = existing.get(row_key)
+                if employee is None and uncoded.get(values['name']):
+                    employee = existing[row_key] = uncoded[values['name']].pop(0)
+                    adopted_ids.add(employee.pk)
+                if employee is None:
+                    employee = Employee(**values)
+                    existing[row_key] = to_create[row_key] = employee
+                    changes.append(EmployeeChange('create', values['name'], {f: (None, values[f]) for f in fields}))
+                    continue
+
+                changed = _diff(employee, values, diff_fields)
+                if not changed:
+                    counts['unchanged'] += 1
+                    continue
+                for field, (_, new) in changed.items():
+                    setattr(employee, field, new)
+                employee.updated_at = now
+                if employee.pk is None:
+                    continue  # created earlier in this import and not saved yet
+                changes.append(EmployeeChange('update', employee.name, changed))
+                to_update[employee.pk] = employee
+                if {'name', 'department'} & set(changed):
+                    refresh_ids.add(employee.pk)
+
+            counts['created'] += len(to_create)
+            counts['updated'] += len(to_update)
+            if not dry_run:
+                if key == 'employee_code':
+                    # ON CONFLICT keeps a concurrent import of the same feed from failing
+                    Employee.objects.bulk_create(
+                        to_create.values(), batch_size=chunk_size,
+                        update_conflicts=True, unique_fields=['employee_code'], update_fields=fields + ('updated_at',),
+                    )
+                else:
+                    Employee.objects.bulk_create(to_create.values(), batch_size=chunk_size)
+                Employee.objects.bulk_update(to_update.values(), write_fields, batch_size=chunk_size)
+
+        if deactivate_missing:
+            stale = _missing_employees(key, seen | skipped, not dry_run, chunk_size, now)
+            if dry_run:
+                # Adopted rows only get their code when written
+                stale = [(pk, name) for pk, name in stale if pk not in adopted_ids]
+            counts['deactivated'] = len(stale)
+            changes.extend(EmployeeChange('deactivate', name, {'active': (True, False)}) for _, name in stale)
+
+        if not dry_run:
+            # Bulk writes bypass model signals
+            if refresh_ids:
+                refresh_search_documents(Visit.objects.filter(employee_id__in=refresh_ids))
+            transaction.on_commit(invalidate_employee_directory)
+
+    return ImportResult(
+        **counts,
+        queries=queries[0],
+        seconds=time.perf_counter() - started,
+        changes=changes,
+    )
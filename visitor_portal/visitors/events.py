@@ -0,0 +1,149 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+
+
+Event = Tuple[int, str, str]  # (id, type, JSON data)
+
+ROW_TEMPLATES = {
+    "ongoing": "visitors/partials/ongoing_visit_row.html",
+    "ended": "visitors/partials/recent_visit_row.html",
+}
+
+
+class VisitEventBroker:
+    """In-process fan-out of visit deltas to dashboard event streams.
+
+    Events are rendered once when published and kept in a short ring buffer,
+    so each connected guard only reads what it has not seen yet. Ids start
+    from the boot time in milliseconds, which keeps them increasing across
+    restarts for ``Last-Event-ID`` resumption.
+    """
+
+    def __init__(self, size: int = 500):
+        self._events = deque(maxlen=size)
+        self._last_id = int(time.time() * 1000)
+        self._cond = threading.Condition()
+        self._waiters = set()
+
+    @property
+    def last_id(self) -> int:
+        return self._last_id
+
+    def publish(self, event_type: str, data: dict) -> int:
+        payload = json.dumps(data, separators=(",", ":"))
+        with self._cond:
+            self._last_id += 1
+            self._events.append((self._last_id, event_type, payload))
+            self._cond.notify_all()
+            waiters = list(self._waiters)
+        for loop, ready in waiters:
+            loop.call_soon_threadsafe(ready.set)
+        return self._last_id
+
+    def since(self, last_id: int) -> Optional[List[Event]]:
+        """Return events after ``last_id``, or None if some were already dropped."""
+        with self._cond:
+            if last_id > self._last_id:
+                return None
+            if self._events and last_id < self._events[0][0] - 1:
+                return None
+            if not self._events and last_id < self._last_id:
+                return None
+            return [event for event in self._events if event[0] > last_id]
+
+    def wait(self, last_id: int, timeout: float) -> Optional[List[Event]]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._last_id != last_id, timeout)
+        return self.since(last_id)
+
+    async def wait_async(self, last_id: int, timeout: float) -> Optional[List[Event]]:
+        ready = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), ready)
+        with self._cond:
+            self._waiters.add(waiter)
+        try:
+            if self._last_id == last_id:
+                try:
+                    await asyncio.wait_for(ready.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._cond:
+                self._waiters.discard(waiter)
+        return self.since(last_id)
+
+
+broker = VisitEventBroker()
+
+# Sync (WSGI) streams each hold a worker thread, so only a few may be open
+_wsgi_streams = threading.BoundedSemaphore(getattr(settings, "DASHBOARD_EVENTS_WSGI_MAX_STREAMS", 1))
+
+KEEPALIVE_SECONDS = 15
+
+
+def visit_event_data(visit) -> dict:
+    template = ROW_TEMPLATES["ended" if visit.status == "ended" else "ongoing"]
+    return {
+        "id": visit.id,
+        "status": visit.status,
+        "html": render_to_string(template, {"v": visit}),
+    }
+
+
+def publish_visit_event(event_type: str, visit) -> None:
+    """Broadcast a created/ended/updated visit once the transaction commits."""
+    transaction.on_commit(lambda: broker.publish(event_type, visit_event_data(visit)))
+
+
+def _format(events: Optional[List[Event]]) -> Tuple[str, Optional[int]]:
+    if events is None:
+        # The client missed events; tell it to reload its lists
+        return f"id: {broker.last_id}\nevent: reset\ndata: {{}}\n\n", broker.last_id
+    chunks = [f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n" for event_id, event_type, data in events]
+    return "".join(chunks), (events[-1][0] if events else None)
+
+
+def poll_events(last_id: int) -> dict:
+    """Events after ``last_id`` as JSON data, for dashboards that cannot hold a stream."""
+    events = broker.since(last_id)
+    if events is None:
+        return {"last_id": broker.last_id, "reset": True, "events": []}
+    return {
+        "last_id": events[-1][0] if events else last_id,
+        "reset": False,
+        "events": [{"id": event_id, "type": event_type, "data": json.loads(data)} for event_id, event_type, data in events],
+    }
+
+
+def event_stream(last_id: int):
+    """Blocking SSE generator for WSGI; closes after a while so the thread is freed."""
+    if not _wsgi_streams.acquire(blocking=False):
+        # Every stream slot is taken; the dashboard switches to polling
+        yield "retry: 30000\nevent: busy\ndata: {}\n\n"
+        return
+    try:
+        yield "retry: 3000\n\n"
+        deadline = time.monotonic() + getattr(settings, "DASHBOARD_EVENTS_WSGI_STREAM_SECONDS", 30)
+        while time.monotonic() < deadline:
+            chunk, new_id = _format(broker.wait(last_id, min(KEEPALIVE_SECONDS, deadline - time.monotonic())))
+            last_id = new_id or last_id
+            yield chunk or ": keep-alive\n\n"
+    finally:
+        _wsgi_streams.release()
+
+
+async def event_stream_async(last_id: int):
+    """Non-blocking SSE generator for ASGI; runs until the client disconnects."""
+    yield "retry: 3000\n\n"
+    while True:
+        chunk, new_id = _format(await broker.wait_async(last_id, KEEPALIVE_SECONDS))
+        last_id = new_id or last_id
+        yield chunk or ": keep-alive\n\n"
@@ -0,0 +1,167 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from .models import Employee, Visitor, Visit
+
+
+class ExportSpec(NamedTuple):
+    queryset: Callable[[], QuerySet]
+    columns: Sequence[Tuple[str, str]]  # (header, values_list lookup)
+    date_field: Optional[str]  # filtered by --since/--until
+
+
+EXPORTS: Dict[str, ExportSpec] = {
+    "employees": ExportSpec(
+        lambda: Employee.objects.order_by("name"),
+        [("employee_code", "employee_code"), ("name", "name"), ("department", "department"),
+         ("phone", "phone"), ("email", "email"), ("active", "active")],
+        None,
+    ),
+    "visitors": ExportSpec(
+        lambda: Visitor.objects.order_by("id"),
+        [("id", "id"), ("full_name", "full_name"), ("phone", "phone"), ("email", "email"),
+         ("address", "address"), ("govt_id_type", "govt_id_type"), ("created_at", "created_at")],
+        "created_at",
+    ),
+    "visits": ExportSpec(
+        lambda: Visit.objects.order_by("started_at", "id"),
+        [("id", "id"), ("started_at", "started_at"), ("ended_at", "ended_at"), ("status", "status"),
+         ("visitor", "visitor__full_name"), ("visitor_phone", "visitor__phone"),
+         ("employee", "employee__name"), ("department", "employee__department"),
+         ("purpose", "purpose"), ("notified_at", "sms_sent_at")],
+        "started_at",
+    ),
+}
+
+FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Rows fetched per round trip from the server-side cursor
+CHUNK_SIZE = 2000
+
+
+def parse_day(value: Optional[str]) -> Optional[date]:
+    """Parse a YYYY-MM-DD filter value; blank means no bound. Raises ValueError."""
+    if not value:
+        return None
+    return date.fromisoformat(value)
+
+
+def _day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def export_rows(kind: str, since: Optional[date] = None, until: Optional[date] = None,
+                chunk_size: int = CHUNK_SIZE) -> Iterator[tuple]:
+    """Yield export rows as tuples, ``since``/``until`` being inclusive local dates.
+
+    ``values_list`` with ``iterator()`` keeps memory flat: rows are not
+    turned into model instances and on PostgreSQL they are read through a
+    server-side cursor ``chunk_size`` at a time.
+    """
+    spec = EXPORTS[kind]
+    queryset = spec.queryset()
+    if spec.date_field and since:
+        queryset = queryset.filter(**{f"{spec.date_field}__gte": _day_start(since)})
+    if spec.date_field and until:
+        queryset = queryset.filter(**{f"{spec.date_field}__lt": _day_start(until + timedelta(days=1))})
+    rows = queryset.values_list(*(lookup for _, lookup in spec.columns)).iterator(chunk_size=chunk_size)
+
+    if connection.vendor == "postgresql":
+        # Server-side cursors only survive Neon's transaction pooling inside
+        # a transaction. SQLite skips this: a long read transaction there
+        # would block the kiosk's writes.
+        with transaction.atomic():
+            yield from rows
+    else:
+        yield from rows
+
+
+def headers(kind: str) -> list:
+    return [header for header, _ in EXPORTS[kind].columns]
+
+
+# Spreadsheets run a cell starting with one of these as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _csv_value(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Names and purposes are typed at the public kiosk; a leading quote
+        # makes Excel show them as text (phones keep their "+" visibly)
+        return "'" + value
+    return "" if value is None else value
+
+
+def csv_chunks(kind: str, rows: Iterable[tuple], rows_per_chunk: int = 500) -> Iterator[str]:
+    """Render rows as CSV text, ``rows_per_chunk`` rows per yielded string."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers(kind))
+    pending = 1
+    for row in rows:
+        writer.writerow([_csv_value(v) for v in row])
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue()
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return timezone.localtime(value).isoformat()
+    return str(value)
+
+
+def ndjson_chunks(kind: str, rows: Iterable[tuple], rows_per_chunk: int = 500) -> Iterator[str]:
+    """Render rows as newline-delimited JSON objects."""
+    names = headers(kind)
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(dict(zip(names, row)), default=_json_default, ensure_ascii=False))
+        if len(lines) >= rows_per_chunk:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+RENDERERS = {
+    "csv": csv_chunks,
+    "ndjson": ndjson_chunks,
+}
+
+
+def gzip_chunks(chunks: Iterable[str]) -> Iterator[bytes]:
+    """Gzip a text stream incrementally, yielding whatever the compressor emits."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(kind: str, fmt: str = "csv", since: Optional[date] = None, until: Optional[date] = None,
+                  compress: bool = False) -> Iterator:
+    """Full pipeline: rows -> CSV/NDJSON text chunks -> optional gzip bytes."""
+    chunks = RENDERERS[fmt](kind, export_rows(kind, since, until))
+    return gzip_chunks(chunks) if compress else chunks
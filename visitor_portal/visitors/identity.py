@@ -0,0 +1,223 @@
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Case, Q, Value, When
+from django.db.models.functions import Lower
+
+from .models import Visitor, Visit
+from .phones import normalize_phone, normalize_phones
+from .search import refresh_search_documents
+
+
+# Details a returning visitor may change at the kiosk
+PROFILE_FIELDS = ("full_name", "phone", "email", "address")
+# Copied onto the kept record from a merged duplicate when it has none
+FILL_FIELDS = ("email", "address", "photo", "govt_id_type", "govt_id_image")
+
+
+class DedupResult(NamedTuple):
+    scanned: int
+    keyed: int  # rows that became the record for their phone
+    merged: int
+    visits_moved: int
+    unkeyed: int  # phone cannot be normalized; left alone
+    conflicts: int  # phone belongs to a visitor with another email; left alone
+
+
+def _matches(phone: Optional[str], email: str) -> Tuple[Optional[Visitor], Optional[Visitor]]:
+    """Return ``(email match, phone match)`` for the intake details.
+
+    One query whose branches are both indexed: the normalized phone is
+    unique and emails are matched through the ``Lower("email")`` index.
+    Among several rows with the email, the one holding the phone is
+    preferred, then the newest.
+    """
+    normalized = normalize_phone(phone) if phone else None
+    match = Q()
+    if normalized:
+        match |= Q(phone_normalized=normalized)
+    if email:
+        match |= Q(email_lower=email)
+    if not match:
+        return None, None
+    ordering = ["-id"]
+    if normalized and email:
+        ordering.insert(0, Case(When(phone_normalized=normalized, then=Value(0)), default=Value(1)))
+    by_email = by_phone = None
+    for visitor in Visitor.objects.alias(email_lower=Lower("email")).filter(match).order_by(*ordering):
+        if normalized and visitor.phone_normalized == normalized:
+            by_phone = visitor
+        if email and by_email is None and visitor.email.strip().lower() == email:
+            by_email = visitor
+    return by_email, by_phone
+
+
+def _owns_phone(visitor: Visitor, email: str) -> bool:
+    """Whether a visitor proving ``email`` may take over ``visitor`` by phone.
+
+    Only when the emails agree, or the record has none to disagree with
+    (rows from before emails were collected).
+    """
+    return visitor.email.strip().lower() in ("", email)
+
+
+def find_returning_visitor(phone: Optional[str] = None, email: Optional[str] = None) -> Optional[Visitor]:
+    """Return the known visitor for ``email`` or, failing that, ``phone``.
+
+    Only pass an email the visitor has proven with the OTP: it is the
+    identity. A phone match is returned only when its email agrees, so a
+    typed number can never select someone else's record.
+    """
+    email = (email or "").strip().lower()
+    by_email, by_phone = _matches(phone, email)
+    if by_email is not None:
+        return by_email
+    if by_phone is not None and _owns_phone(by_phone, email):
+        return by_phone
+    return None
+
+
+def _create_visitor(values: dict, keyed: bool = True) -> Visitor:
+    visitor = Visitor(**values)
+    if not keyed:
+        # The phone is another visitor's identity; see visitor_normalize_phone
+        visitor._unkeyed = True
+    visitor.save()
+    return visitor
+
+
+def save_visitor(details: dict) -> Visitor:
+    """Create a visitor from intake ``details``, or update the returning one.
+
+    The returning visitor is the one with the verified email; only changed
+    fields are written, so a repeat visit with the same details costs one
+    lookup and no write. A phone already held by a visitor with another
+    email is never claimed: that record is left alone and the visitor
+    keeps (or gets) a record of their own that is not keyed on the phone.
+    """
+    values = {field: details[field] for field in PROFILE_FIELDS}
+    email = values["email"].strip().lower()
+    by_email, by_phone = _matches(values["phone"], email)
+    # Someone else's number: shared by a household, reassigned, or mistyped
+    taken = by_phone is not None and by_phone != by_email and (by_email is not None or not _owns_phone(by_phone, email))
+    visitor = by_email if taken else by_email or by_phone
+    if visitor is None:
+        try:
+            with transaction.atomic():
+                return _create_visitor(values, keyed=not taken)
+        except IntegrityError:
+            # Another kiosk registered the same phone a moment ago
+            visitor = find_returning_visitor(values["phone"], email)
+            if visitor is None:
+                return _create_visitor(values, keyed=False)
+
+    fields = [field for field in PROFILE_FIELDS if not (taken and field == "phone")]
+    changed = [field for field in fields if getattr(visitor, field) != values[field]]
+    if "phone" in changed and visitor.phone_normalized and visitor.phone_normalized == normalize_phone(values["phone"]):
+        # Same number typed differently; rewriting it would reindex every visit
+        changed.remove("phone")
+    if changed:
+        for field in changed:
+            setattr(visitor, field, values[field])
+        if "phone" in changed:
+            changed.append("phone_normalized")
+        visitor.save(update_fields=changed)
+    return visitor
+
+
+def _update_from_map(model, field: str, key: str, mapping: Dict) -> int:
+    """``UPDATE model SET field = mapping[key]`` for every key, in one statement.
+
+    The map is joined in as a VALUES list (its columns are column1/column2
+    on both SQLite and PostgreSQL); an ORM Case/When with a branch per row,
+    as ``bulk_update`` builds, costs far more to compile than to run.
+    """
+    qn = connection.ops.quote_name
+    table = qn(model._meta.db_table)
+    target = qn(model._meta.get_field(field).column)
+    source = f"{table}.{qn(model._meta.get_field(key).column)}"
+    pairs = ", ".join(["(%s, %s)"] * len(mapping))
+    keys = ", ".join(["%s"] * len(mapping))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET {target} = "
+            f"(SELECT m.column2 FROM (VALUES {pairs}) AS m WHERE m.column1 = {source}) "
+            f"WHERE {source} IN ({keys})",
+            [value for pair in mapping.items() for value in pair] + list(mapping),
+        )
+        return cursor.rowcount
+
+
+def merge_duplicate_visitors(batch_size: int = 1000) -> DedupResult:
+    """Fold visitor rows without a ``phone_normalized`` into one record per phone.
+
+    Unkeyed rows are read newest first, ``batch_size`` at a time. The
+    first row seen for a phone becomes its record unless one already
+    exists; older rows are merged into it: their visits are repointed with
+    a single UPDATE, blank details on the kept record are filled from them,
+    and they are deleted. As at the kiosk, a row is only merged when its
+    email matches the kept record's or one of them has none; different
+    people sharing a phone keep their own records. Each batch is its own transaction, so the kiosk
+    is never blocked for long and an interrupted run can simply be started
+    again.
+    """
+    counts = dict.fromkeys(DedupResult._fields, 0)
+    last_id = None
+    while True:
+        pending = Visitor.objects.filter(phone_normalized__isnull=True).order_by("-id")
+        if last_id is not None:
+            pending = pending.filter(id__lt=last_id)
+        batch = list(pending[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1].id
+        counts["scanned"] += len(batch)
+        phones = normalize_phones(visitor.phone for visitor in batch)
+
+        with transaction.atomic():
+            keepers: Dict[str, Visitor] = {
+                visitor.phone_normalized: visitor
+                for visitor in Visitor.objects.filter(phone_normalized__in={p for p in phones if p})
+            }
+            keyed: List[Visitor] = []  # first seen for their phone
+            filled: Dict[int, Visitor] = {}
+            fill_fields: Set[str] = set()
+            merges: Dict[int, int] = {}  # duplicate id -> kept id
+            renamed: List[int] = []  # duplicates whose visits need a new search document
+            for visitor, phone in zip(batch, phones):
+                if phone is None:
+                    counts["unkeyed"] += 1
+                    continue
+                keeper = keepers.get(phone)
+                if keeper is None:
+                    visitor.phone_normalized = phone
+                    keepers[phone] = visitor
+                    keyed.append(visitor)
+                    continue
+                email = visitor.email.strip().lower()
+                if email and not _owns_phone(keeper, email):
+                    counts["conflicts"] += 1
+                    continue
+                merges[visitor.id] = keeper.id
+                if (visitor.full_name, visitor.phone) != (keeper.full_name, keeper.phone):
+                    renamed.append(visitor.id)
+                for field in FILL_FIELDS:
+                    if not getattr(keeper, field) and getattr(visitor, field):
+                        setattr(keeper, field, getattr(visitor, field))
+                        filled[keeper.id] = keeper
+                        fill_fields.add(field)
+
+            if keyed:
+                _update_from_map(Visitor, "phone_normalized", "id", {v.id: v.phone_normalized for v in keyed})
+            # Few kept rows lack details, so this CASE stays small
+            Visitor.objects.bulk_update(filled.values(), sorted(fill_fields | {"phone_normalized"}), batch_size=batch_size)
+            if merges:
+                stale = list(Visit.objects.filter(visitor_id__in=renamed).values_list("id", flat=True))
+                counts["visits_moved"] += _update_from_map(Visit, "visitor", "visitor", merges)
+                if stale:
+                    refresh_search_documents(Visit.objects.filter(id__in=stale))
+                Visitor.objects.filter(id__in=merges).delete()
+                counts["merged"] += len(merges)
+            counts["keyed"] += len(keyed)
+
+    return DedupResult(**counts)
@@ -0,0 +1,127 @@
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+
+# Visitor fields run through the pipeline, with their upload_to directories
+IMAGE_FIELDS = {
+    "photo": "visitor_photos/",
+    "govt_id_image": "visitor_ids/",
+}
+THUMBNAIL_DIR = "thumbs/"
+EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+CONTENT_TYPES = {"webp": "image/webp", "jpg": "image/jpeg"}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _format() -> str:
+    fmt = getattr(settings, "IMAGE_FORMAT", "WEBP").upper()
+    return fmt if fmt in EXTENSIONS else "WEBP"
+
+
+def _encode(image: Image.Image, icc_profile: Optional[bytes] = None) -> bytes:
+    """Encode to the configured format with no metadata but the colour profile."""
+    fmt = _format()
+    if fmt == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")  # JPEG has no alpha channel
+    elif image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode.endswith("A") else "RGB")
+    options = {"quality": getattr(settings, "IMAGE_QUALITY", 80)}
+    if fmt == "JPEG":
+        options.update(optimize=True, progressive=True)
+    else:
+        options["method"] = 4  # encoder effort; 6 is ~2x slower for ~3% smaller files
+    if icc_profile:
+        options["icc_profile"] = icc_profile
+    buffer = io.BytesIO()
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+
+def _prepare(image: Image.Image, size: int) -> Image.Image:
+    # JPEG can decode at 1/2, 1/4 or 1/8 scale, far cheaper than a full
+    # decode of a 12MP phone photo followed by a resize
+    image.draft("RGB", (size, size))
+    # Apply the camera's orientation before the EXIF carrying it is dropped
+    return ImageOps.exif_transpose(image)
+
+
+def encode_upload(upload, name: str = "") -> ContentFile:
+    """Re-encode an uploaded photo or ID scan for storage.
+
+    The result is rotated upright, bounded to IMAGE_MAX_DIMENSION on its
+    longest side and carries no EXIF (GPS position, device, timestamps).
+    A digest of the encoded bytes goes into the file name, so a name
+    always refers to the same content and its thumbnail can be cached for
+    good.
+    """
+    max_dimension = getattr(settings, "IMAGE_MAX_DIMENSION", 1600)
+    upload.seek(0)
+    with Image.open(upload) as original:
+        icc_profile = original.info.get("icc_profile")
+        image = _prepare(original, max_dimension)
+        image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        data = _encode(image, icc_profile)
+    stem = os.path.splitext(os.path.basename(name or upload.name or "image"))[0][:40] or "image"
+    digest = hashlib.sha256(data).hexdigest()[:12]
+    return ContentFile(data, name=f"{stem}-{digest}.{EXTENSIONS[_format()]}")
+
+
+def thumbnail_name(name: str) -> str:
+    return f"{THUMBNAIL_DIR}{os.path.splitext(name)[0]}.{EXTENSIONS[_format()]}"
+
+
+def is_thumbnail_source(name: str) -> bool:
+    """Only files under the image fields' directories get thumbnails."""
+    return ".." not in name.split("/") and name.startswith(tuple(IMAGE_FIELDS.values()))
+
+
+def make_thumbnail(name: str, storage=default_storage) -> str:
+    """Write the square thumbnail of stored image ``name``; returns its name."""
+    size = getattr(settings, "IMAGE_THUMBNAIL_SIZE", 240)
+    target = thumbnail_name(name)
+    with storage.open(name, "rb") as source, Image.open(source) as original:
+        icc_profile = original.info.get("icc_profile")
+        image = ImageOps.fit(_prepare(original, size), (size, size), Image.Resampling.LANCZOS)
+        data = _encode(image, icc_profile)
+    if storage.exists(target):
+        storage.delete(target)
+    storage.save(target, ContentFile(data))
+    return target
+
+
+def _thumbnail_executor() -> Optional[ThreadPoolExecutor]:
+    """Bounded pool so thumbnails are made off the request path."""
+    global _executor
+    workers = getattr(settings, "IMAGE_THUMBNAIL_WORKERS", 1)
+    if workers <= 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="thumbnails")
+    return _executor
+
+
+def _run(name: str) -> None:
+    try:
+        make_thumbnail(name)
+    except Exception as e:
+        print(f"❌ Thumbnail for {name} failed: {e}")
+
+
+def schedule_thumbnail(name: str) -> None:
+    """Make the thumbnail in the background; without workers it is made on first view."""
+    executor = _thumbnail_executor()
+    if executor is not None:
+        executor.submit(_run, name)
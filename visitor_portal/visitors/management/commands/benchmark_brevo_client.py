@@ -0,0 +1,101 @@
+"""
+Compare per-message latency of a fresh Brevo client per send (the old
+behaviour) against the shared pooled client, using a local HTTP stand-in
+for the Brevo API so no real emails are sent.
+Usage: python manage.py benchmark_brevo_client --messages 300 --concurrency 1 10 100
+"""
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from visitors.email import build_brevo_api, deliver_email, get_brevo_api
+
+
+class _StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.connections = 0
+        self._count_lock = threading.Lock()
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+
+    def process_request(self, request, client_address):
+        with self._count_lock:
+            self.connections += 1
+        super().process_request(request, client_address)
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients may keep the connection open between requests
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without this Nagle's algorithm
+    # adds ~40ms to every reused connection
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = json.dumps({"messageId": f"<bench-{time.monotonic_ns()}@local>"}).encode()
+        self.send_response(201)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Benchmark Brevo sends with a fresh client per message versus the shared pooled client"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=300, help='Emails sent per run')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 100], help='Parallel senders per run')
+        parser.add_argument('--latency-ms', type=float, default=2.0, help='Simulated server processing time')
+
+    def handle(self, *args, **options):
+        server = _StandInServer(options['latency_ms'] / 1000)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host = f"http://127.0.0.1:{server.server_address[1]}/v3"
+        self.stdout.write(f"Stand-in Brevo API at {host}, {options['messages']} messages per run")
+        self.stdout.write(f"{'mode':<8} {'conc':>5} {'p50 ms':>8} {'p95 ms':>8} {'msg/s':>8} {'conns':>6}")
+        try:
+            for concurrency in options['concurrency']:
+                with override_settings(BREVO_API_KEY="bench", BREVO_API_HOST=host, BREVO_CONNECTION_POOL_SIZE=concurrency):
+                    for mode in ("fresh", "pooled"):
+                        self.run(server, mode, concurrency, options['messages'], host)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def run(self, server, mode, concurrency, messages, host):
+        if mode == "pooled":
+            get_brevo_api()  # client construction is a one-off cost, not per message
+
+        def send(i):
+            started = time.perf_counter()
+            api = build_brevo_api("bench", host, concurrency) if mode == "fresh" else None
+            deliver_email(f"bench{i}@example.com", "Benchmark", "Benchmark message", api=api)
+            return time.perf_counter() - started
+
+        server.connections = 0
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = sorted(pool.map(send, range(messages)))
+        elapsed = time.perf_counter() - started
+
+        p50 = statistics.median(latencies) * 1000
+        p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+        self.stdout.write(
+            f"{mode:<8} {concurrency:>5} {p50:>8.2f} {p95:>8.2f} {messages / elapsed:>8.0f} {server.connections:>6}"
+        )
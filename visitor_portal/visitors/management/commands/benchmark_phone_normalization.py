@@ -0,0 +1,88 @@
+"""
+Time phone normalization on synthetic numbers: the previous per-call regex
+implementation versus the memoized scalar and bulk column APIs.
+Usage: python manage.py benchmark_phone_normalization --count 1000000 --distinct 50000
+"""
+import random
+import re
+import time
+from typing import Optional
+
+from django.core.management.base import BaseCommand
+
+from visitors.phones import normalize_phone, normalize_phones
+
+
+def legacy_normalize_phone(raw: str, default_country: str = "IN") -> Optional[str]:
+    """The implementation previously in visitors/sms.py, kept as a baseline."""
+    if not raw:
+        return None
+    s = str(raw).strip()
+    if s.startswith('+'):
+        digits = '+' + re.sub(r"\D", "", s[1:])
+        if re.fullmatch(r"\+[0-9]{10,15}", digits):
+            return digits
+        return None
+    digits_only = re.sub(r"\D", "", s)
+    if not digits_only:
+        return None
+    digits_only = digits_only.lstrip('0') or '0'
+    if default_country.upper() == 'IN':
+        if len(digits_only) == 10:
+            return "+91" + digits_only
+        if digits_only.startswith('91') and len(digits_only) == 12:
+            return "+" + digits_only
+    if 10 <= len(digits_only) <= 15:
+        return "+" + digits_only
+    return None
+
+
+FORMATS = [
+    lambda n: n,
+    lambda n: f"+91{n}",
+    lambda n: f"+91 {n[:5]} {n[5:]}",
+    lambda n: f"0{n}",
+    lambda n: f"91-{n[:5]}-{n[5:]}",
+    lambda n: f"({n[:3]}) {n[3:6]}-{n[6:]}",
+    lambda n: f"+44 20 {n[2:6]} {n[6:]}",
+    lambda n: n[:7],  # too short, rejected
+]
+
+
+class Command(BaseCommand):
+    help = "Benchmark phone normalization (legacy, memoized scalar, bulk) on synthetic numbers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=1_000_000, help='Numbers to normalize')
+        parser.add_argument('--distinct', type=int, default=50_000, help='Distinct numbers among them')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        pool = [
+            rng.choice(FORMATS)(str(rng.randint(6_000_000_000, 9_999_999_999)))
+            for _ in range(options['distinct'])
+        ]
+        numbers = [rng.choice(pool) for _ in range(options['count'])]
+        self.stdout.write(f"{len(numbers):,} numbers, {len(set(numbers)):,} distinct")
+
+        normalize_phone.cache_clear()
+        runs = [
+            ("legacy (re per call)", lambda: [legacy_normalize_phone(n) for n in numbers]),
+            ("normalize_phone (LRU)", lambda: [normalize_phone(n) for n in numbers]),
+            ("normalize_phones (bulk)", lambda: normalize_phones(numbers)),
+        ]
+        baseline = None
+        for label, run in runs:
+            started = time.perf_counter()
+            result = run()
+            elapsed = time.perf_counter() - started
+            if baseline is None:
+                baseline = (result, elapsed)
+                speedup = ""
+            else:
+                mismatches = sum(a != b for a, b in zip(result, baseline[0]))
+                speedup = f"  x{baseline[1] / elapsed:.1f}, {mismatches} mismatches"
+            self.stdout.write(f"{label:<26} {elapsed:8.3f}s  {len(numbers) / elapsed:>12,.0f}/s{speedup}")
+        info = normalize_phone.cache_info()
+        self.stdout.write(f"LRU: {info.hits:,} hits, {info.misses:,} misses, size {info.currsize}/{info.maxsize}")
@@ -0,0 +1,75 @@
+"""
+Walk the kiosk flow (open visit page, back to intake, visit page again, end
+visit) under each session mode and count the database round trips per request.
+Usage: python manage.py benchmark_sessions [--rounds 20] [--modes db cached_db signed_cookies]
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from visitors.models import Employee, Visitor, Visit
+
+
+BENCH_PREFIX = "bench-"
+ENGINES = settings.SESSION_ENGINES
+
+
+class Command(BaseCommand):
+    help = "Compare per-request database round trips and latency of the session engines"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=20, help='Kiosk flows walked per mode')
+        parser.add_argument('--modes', nargs='+', choices=list(ENGINES), default=list(ENGINES))
+
+    def handle(self, *args, **options):
+        employee = Employee.objects.create(name=f"{BENCH_PREFIX}employee", phone="9000000000")
+        visitor = Visitor.objects.create(full_name=f"{BENCH_PREFIX}visitor", phone="+919000000001")
+        try:
+            self.stdout.write(f"Database: {connection.vendor}, {options['rounds']} kiosk flows per mode")
+            self.stdout.write(f"{'mode':<16} {'step':<18} {'queries':>8} {'session':>8} {'median ms':>10}")
+            for mode in options['modes']:
+                # Each mode starts on its own empty in-process cache; the
+                # configured one may be shared with the running site
+                bench_cache = {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': f'bench-{mode}'}
+                caches = {alias: bench_cache for alias in settings.CACHES}
+                with override_settings(SESSION_ENGINE=ENGINES[mode], CACHES=caches, ALLOWED_HOSTS=['testserver']):
+                    self.run_mode(mode, employee, visitor, options['rounds'])
+        finally:
+            Visitor.objects.filter(full_name__startswith=BENCH_PREFIX).delete()
+            Employee.objects.filter(name__startswith=BENCH_PREFIX).delete()
+
+    def run_mode(self, mode, employee, visitor, rounds):
+        steps = {}
+        for _ in range(rounds):
+            visit = Visit.objects.create(visitor=visitor, employee=employee, purpose="Benchmark")
+            client = Client()
+            flow = [
+                ('visit page (new)', reverse('visit_detail', args=[visit.id])),
+                ('intake redirect', reverse('intake')),
+                ('visit page', reverse('visit_detail', args=[visit.id])),
+                ('end visit', reverse('end_visit', args=[visit.id])),
+            ]
+            for step, url in flow:
+                with CaptureQueriesContext(connection) as ctx:
+                    started = time.perf_counter()
+                    client.get(url)
+                    elapsed = (time.perf_counter() - started) * 1000
+                sql = [q['sql'] for q in ctx.captured_queries]
+                counts = steps.setdefault(step, ([], [], []))
+                counts[0].append(len(sql))
+                counts[1].append(sum('django_session' in s for s in sql))
+                counts[2].append(elapsed)
+        total = 0
+        for step, (queries, session, timings) in steps.items():
+            total += statistics.mean(queries)
+            self.stdout.write(
+                f"{mode:<16} {step:<18} {statistics.mean(queries):>8.1f} "
+                f"{statistics.mean(session):>8.1f} {statistics.median(timings):>10.2f}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{mode:<16} {'whole flow':<18} {total:>8.1f}"))
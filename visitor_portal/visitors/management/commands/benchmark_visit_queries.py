@@ -0,0 +1,171 @@
+"""
+Seed a large Visit table and compare dashboard/admin query plans and latency
+with and without the Visit indexes. It drops and re-creates indexes and inserts
+rows, so it only runs with DEBUG on unless --force is given.
+Usage: python manage.py benchmark_visit_queries --seed 1000000
+"""
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from visitors.models import Employee, Visitor, Visit
+from visitors.views import ONGOING_PAGE_SIZE, RECENT_PAGE_SIZE
+
+
+BENCH_PREFIX = "bench-"
+
+
+class Command(BaseCommand):
+    help = "Benchmark Visit query shapes before and after the dashboard indexes (optionally seeding data)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0, help='Number of synthetic visits to insert before measuring')
+        parser.add_argument('--employees', type=int, default=500, help='Synthetic employees to spread seeded visits over')
+        parser.add_argument('--visitors', type=int, default=20000, help='Synthetic visitors to spread seeded visits over')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per query')
+        parser.add_argument('--no-plans', action='store_true', help='Skip printing EXPLAIN output')
+        parser.add_argument('--cleanup', action='store_true', help='Delete all synthetic benchmark rows and exit')
+        parser.add_argument('--force', action='store_true',
+                            help='Run with DEBUG off, e.g. against a staging copy (never the live database)')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            deleted, _ = Visitor.objects.filter(full_name__startswith=BENCH_PREFIX).delete()
+            deleted_emp, _ = Employee.objects.filter(name__startswith=BENCH_PREFIX).delete()
+            self.stdout.write(self.style.SUCCESS(f"Deleted {deleted + deleted_emp} benchmark rows"))
+            return
+
+        if not settings.DEBUG and not options['force']:
+            raise CommandError(
+                'This drops the Visit indexes and inserts synthetic rows. Run it against a development '
+                'database (DEBUG=True), or pass --force for a disposable copy.'
+            )
+
+        if options['seed']:
+            self.seed(options['seed'], options['employees'], options['visitors'])
+
+        if not Visit.objects.exists():
+            raise CommandError('No visits to benchmark. Use --seed N to insert synthetic data.')
+
+        indexes = list(Visit._meta.indexes)
+        existing = self._existing_index_names()
+        missing = [idx.name for idx in indexes if idx.name not in existing]
+        if missing:
+            raise CommandError(f"Indexes missing, run migrate first: {', '.join(missing)}")
+
+        self.stdout.write(f"Database: {connection.vendor}, visits: {Visit.objects.count()}")
+        with connection.schema_editor() as editor:
+            for idx in indexes:
+                editor.remove_index(Visit, idx)
+        try:
+            self._analyze()
+            before = self.measure('without indexes', options)
+        finally:
+            with connection.schema_editor() as editor:
+                for idx in indexes:
+                    editor.add_index(Visit, idx)
+        self._analyze()
+        after = self.measure('with indexes', options)
+
+        self.stdout.write('')
+        self.stdout.write(f"{'query':<28} {'before ms':>12} {'after ms':>12} {'speedup':>9}")
+        for name, before_ms in before.items():
+            after_ms = after[name]
+            speedup = before_ms / after_ms if after_ms else float('inf')
+            self.stdout.write(f"{name:<28} {before_ms:>12.2f} {after_ms:>12.2f} {speedup:>8.1f}x")
+
+    def seed(self, count, employee_count, visitor_count):
+        started = time.perf_counter()
+        Employee.objects.bulk_create(
+            [Employee(name=f"{BENCH_PREFIX}employee-{i}", phone="9000000000", department=f"Dept {i % 20}")
+             for i in range(employee_count)],
+            batch_size=1000,
+        )
+        Visitor.objects.bulk_create(
+            [Visitor(full_name=f"{BENCH_PREFIX}visitor-{i}", phone=f"9{i:09d}", address="Benchmark")
+             for i in range(visitor_count)],
+            batch_size=1000,
+        )
+        employee_ids = list(Employee.objects.filter(name__startswith=BENCH_PREFIX).values_list('id', flat=True))
+        visitor_ids = list(Visitor.objects.filter(full_name__startswith=BENCH_PREFIX).values_list('id', flat=True))
+
+        rnd = random.Random(42)
+        now = timezone.now()
+        span = int(timedelta(days=730).total_seconds())
+        batch = []
+        for i in range(count):
+            started_at = now - timedelta(seconds=rnd.randint(0, span))
+            # About 1% of visits are still in progress
+            if rnd.random() < 0.01:
+                ended_at, status = None, "ongoing"
+            else:
+                ended_at, status = started_at + timedelta(minutes=rnd.randint(5, 240)), "ended"
+            batch.append(Visit(
+                visitor_id=rnd.choice(visitor_ids),
+                employee_id=rnd.choice(employee_ids),
+                purpose="Benchmark",
+                started_at=started_at,
+                ended_at=ended_at,
+                status=status,
+            ))
+            if len(batch) >= 5000:
+                Visit.objects.bulk_create(batch)
+                batch = []
+                self.stdout.write(f"\rSeeded {i + 1}/{count} visits", ending='')
+                self.stdout.flush()
+        if batch:
+            Visit.objects.bulk_create(batch)
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(f"Seeded {count} visits in {time.perf_counter() - started:.1f}s"))
+
+    def queries(self):
+        now = timezone.now()
+        month_start = (now - timedelta(days=60)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        month_end = (month_start + timedelta(days=32)).replace(day=1)
+        employee_id = Visit.objects.values_list('employee_id', flat=True).first()
+        related = Visit.objects.select_related('visitor', 'employee')
+        # The dashboard's first keyset pages, as views.dashboard builds them
+        recent = related.filter(status="ended").annotate(recent_at=Coalesce("ended_at", "started_at"))
+        return {
+            'dashboard ongoing': related.filter(status="ongoing").order_by("-started_at", "-id")[:ONGOING_PAGE_SIZE + 1],
+            'dashboard recent': recent.order_by("-recent_at", "-id")[:RECENT_PAGE_SIZE + 1],
+            'dashboard month': recent.filter(
+                started_at__gte=month_start, started_at__lt=month_end,
+            ).order_by("-recent_at", "-id")[:RECENT_PAGE_SIZE + 1],
+            'admin list': related.order_by("-started_at")[:100],
+            'admin status filter': related.filter(status="ended").order_by("-started_at")[:100],
+            'admin employee filter': related.filter(employee_id=employee_id).order_by("-started_at")[:100],
+        }
+
+    def measure(self, label, options):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"\n== {label} =="))
+        results = {}
+        for name, qs in self.queries().items():
+            if not options['no_plans']:
+                self.stdout.write(self.style.MIGRATE_LABEL(name))
+                self.stdout.write(qs.explain())
+            list(qs)  # warm up
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(qs.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            results[name] = statistics.median(timings)
+            self.stdout.write(f"{name}: median {results[name]:.2f} ms over {options['repeat']} runs")
+        return results
+
+    def _existing_index_names(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Visit._meta.db_table)
+        return {name for name, info in constraints.items() if info.get('index')}
+
+    def _analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {connection.ops.quote_name(Visit._meta.db_table)}")
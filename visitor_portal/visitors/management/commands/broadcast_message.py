@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from visitors.models import Employee
+from visitors.outbox import enqueue_many, process_due
+
+
+class Command(BaseCommand):
+    help = "Queue one message (e.g. an evacuation notice) for all active employees"
+
+    def add_arguments(self, parser):
+        parser.add_argument('message', help='Text to send')
+        parser.add_argument('--channel', choices=['sms', 'whatsapp', 'email'], default='sms')
+        parser.add_argument('--subject', default='Notice from reception', help='Email subject')
+        parser.add_argument('--department', help='Only employees in this department')
+        parser.add_argument('--send', action='store_true', help='Deliver now instead of waiting for run_outbox')
+
+    def handle(self, *args, **options):
+        employees = Employee.objects.filter(active=True)
+        if options['department']:
+            employees = employees.filter(department__iexact=options['department'])
+        field = 'email' if options['channel'] == 'email' else 'phone'
+        recipients = [r for r in employees.exclude(**{field: ''}).values_list(field, flat=True) if r]
+        if not recipients:
+            raise CommandError('No matching employees with a contact for this channel')
+
+        queued = enqueue_many(options['channel'], recipients, options['message'], subject=options['subject'])
+        self.stdout.write(self.style.SUCCESS(f"Queued {queued} {options['channel']} message(s)"))
+
+        if options['send']:
+            while True:
+                result = process_due(limit=500)
+                if not result['sent'] + result['failed']:
+                    break
+                self.stdout.write(f"Sent {result['sent']}, failed {result['failed']}")
@@ -0,0 +1,46 @@
+"""
+Stream employees, visitors or visits to CSV or NDJSON in constant memory.
+Usage: python manage.py export_data visits --since 2025-01-01 --until 2025-12-31 --gzip --out visits-2025.csv.gz
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from visitors.exports import EXPORTS, FORMATS, export_stream, parse_day
+
+
+class Command(BaseCommand):
+    help = "Export employees, visitors or visits as streamed CSV/NDJSON, optionally gzipped"
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(EXPORTS))
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--since', type=str, default='', help='First day to include (YYYY-MM-DD)')
+        parser.add_argument('--until', type=str, default='', help='Last day to include (YYYY-MM-DD)')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output')
+        parser.add_argument('--out', type=str, default='-', help='Output file path or - for stdout')
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_day(options['since'])
+            until = parse_day(options['until'])
+        except ValueError:
+            raise CommandError("--since/--until must be YYYY-MM-DD")
+        chunks = export_stream(options['kind'], options['format'], since, until, options['gzip'])
+
+        out = options['out']
+        if out in ('-', ''):
+            stream = sys.stdout.buffer if options['gzip'] else sys.stdout
+            for chunk in chunks:
+                stream.write(chunk)
+            stream.flush()
+            return
+        if options['gzip']:
+            f = open(out, 'wb')
+        else:
+            f = open(out, 'w', newline='', encoding='utf-8')
+        with f:
+            size = 0
+            for chunk in chunks:
+                size += f.write(chunk)
+        self.stdout.write(self.style.SUCCESS(f"Exported {options['kind']} to {out} ({size:,} {'bytes' if options['gzip'] else 'chars'})"))
@@ -1,41 +1,24 @@
 from django.core.management.base import BaseCommand
-from visitors.models import Employee
-import csv
+from visitors.exports import export_stream
 import sys
 
 
 class Command(BaseCommand):
-    help = "Export employees to CSV with headers: name,department,phone,email,active"
+    help = "Export employees to CSV with headers: employee_code,name,department,phone,email,active"
 
     def add_arguments(self, parser):
         parser.add_argument('--out', type=str, default='-', help='Output file path or - for stdout')
 
     def handle(self, *args, **options):
         out = options['out']
-        fieldnames = ['name', 'department', 'phone', 'email', 'active']
         if out == '-' or out == '':
-            writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames)
-            writer.writeheader()
-            for e in Employee.objects.all().order_by('name'):
-                writer.writerow({
-                    'name': e.name,
-                    'department': e.department,
-                    'phone': e.phone,
-                    'email': e.email,
-                    'active': '1' if e.active else '0',
-                })
+            self.write_csv(sys.stdout)
         else:
             with open(out, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=fieldnames)
-                writer.writeheader()
-                for e in Employee.objects.all().order_by('name'):
-                    writer.writerow({
-                        'name': e.name,
-                        'department': e.department,
-                        'phone': e.phone,
-                        'email': e.email,
-                        'active': '1' if e.active else '0',
-                    })
+                self.write_csv(f)
             self.stdout.write(self.style.SUCCESS(f"Exported employees to {out}"))
 
-
+    def write_csv(self, stream):
+        # Same columns import_employees reads, so an edited export can be re-imported
+        for chunk in export_stream("employees"):
+            stream.write(chunk)
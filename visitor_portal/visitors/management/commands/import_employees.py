@@ -1,79 +1,73 @@
 from django.core.management.base import BaseCommand, CommandError
-from visitors.models import Employee
+from visitors.employee_import import import_employees
 import csv
-from typing import Optional
-
-
-def normalize_phone(raw: str) -> str:
-    s = (raw or "").strip()
-    # If 10 digits (likely India), keep as-is; our sms layer will prefix +91
-    digits = ''.join(ch for ch in s if ch.isdigit())
-    return digits
 
 
 class Command(BaseCommand):
-    help = "Import or update employees from a CSV file with headers: name,department,phone[,email][,active]"
+    help = ("Import or update employees from a CSV file with headers: name,department,phone[,email][,active]"
+            "[,employee_code]. Rows are matched on employee_code when the column is present, otherwise on name.")
 
     def add_arguments(self, parser):
         parser.add_argument('csv_path', type=str, help='Path to employees CSV')
         parser.add_argument('--deactivate-missing', action='store_true', help='Mark employees not present in CSV as inactive')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change without writing anything')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Rows read and written per batch')
 
     def handle(self, *args, **options):
         path = options['csv_path']
-        deactivate_missing = options['deactivate_missing']
+        dry_run = options['dry_run']
         try:
             with open(path, newline='', encoding='utf-8-sig') as f:
                 reader = csv.DictReader(f)
                 required = {'name', 'department', 'phone'}
-                if not required.issubset({h.strip().lower() for h in reader.fieldnames or []}):
+                headers = {h.strip().lower() for h in reader.fieldnames or []}
+                if not required.issubset(headers):
                     raise CommandError('CSV must include headers: name, department, phone')
 
-                seen_names = set()
-                created = 0
-                updated = 0
-                for row in reader:
-                    name = (row.get('name') or '').strip()
-                    dept = (row.get('department') or '').strip()
-                    phone = normalize_phone(row.get('phone') or '')
-                    email = (row.get('email') or '').strip()
-                    active_raw = (row.get('active') or '').strip().lower()
-                    active = True if active_raw in ('', '1', 'true', 'yes', 'y') else False
-
-                    if not name or not phone:
-                        continue
-
-                    emp, is_created = Employee.objects.get_or_create(name=name, defaults={
-                        'department': dept,
-                        'phone': phone,
-                        'email': email,
-                        'active': active,
-                    })
-                    if is_created:
-                        created += 1
-                    else:
-                        changed = False
-                        if emp.department != dept:
-                            emp.department = dept; changed = True
-                        if emp.phone != phone:
-                            emp.phone = phone; changed = True
-                        if email and emp.email != email:
-                            emp.email = email; changed = True
-                        if emp.active != active:
-                            emp.active = active; changed = True
-                        if changed:
-                            emp.save()
-                            updated += 1
-                    seen_names.add(name)
-
-                if deactivate_missing:
-                    qs = Employee.objects.filter(active=True).exclude(name__in=seen_names)
-                    count = qs.update(active=False)
-                    self.stdout.write(self.style.WARNING(f"Deactivated {count} employees not in CSV"))
-
-                self.stdout.write(self.style.SUCCESS(f"Employees import complete. Created: {created}, Updated: {updated}"))
+                result = import_employees(
+                    reader,
+                    key='employee_code' if 'employee_code' in headers else 'name',
+                    deactivate_missing=options['deactivate_missing'],
+                    dry_run=dry_run,
+                    chunk_size=options['chunk_size'],
+                )
         except FileNotFoundError:
             raise CommandError(f'File not found: {path}')
+        except CommandError:
+            raise
         except Exception as e:
             raise CommandError(str(e))
 
+        if dry_run:
+            self.report_changes(result.changes, options['verbosity'])
+        if result.deactivated:
+            verb = "Would deactivate" if dry_run else "Deactivated"
+            self.stdout.write(self.style.WARNING(f"{verb} {result.deactivated} employees not in CSV"))
+        if result.invalid:
+            self.stdout.write(self.style.WARNING(
+                f"Skipped {result.invalid} rows with a missing name or invalid phone number; "
+                "employees named in them are left as they are"
+            ))
+        if result.duplicates:
+            self.stdout.write(self.style.WARNING(f"{result.duplicates} rows repeated an earlier name; the last one wins"))
+        title = "Dry run, nothing written." if dry_run else "Employees import complete."
+        self.stdout.write(self.style.SUCCESS(
+            f"{title} Created: {result.created}, Updated: {result.updated}, Unchanged: {result.unchanged}"
+        ))
+        self.stdout.write(
+            f"{result.rows} rows in {result.seconds:.2f}s ({result.rows_per_second:,.0f} rows/s, {result.queries} queries)"
+        )
 
+    def report_changes(self, changes, verbosity):
+        # Show everything with -v 2, otherwise a sample
+        limit = None if verbosity > 1 else 50
+        for change in changes[:limit]:
+            if change.action == 'create':
+                self.stdout.write(self.style.SUCCESS(f"+ {change.name}"))
+            elif change.action == 'deactivate':
+                self.stdout.write(self.style.WARNING(f"- {change.name} (deactivate)"))
+            else:
+                diff = ", ".join(f"{field}: {old!r} -> {new!r}" for field, (old, new) in change.fields.items())
+                self.stdout.write(f"~ {change.name}: {diff}")
+        if limit is not None and len(changes) > limit:
+            self.stdout.write(f"... and {len(changes) - limit} more (use -v 2 to list all)")
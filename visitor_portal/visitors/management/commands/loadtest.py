@@ -0,0 +1,74 @@
+"""
+Load-test the kiosk and guard dashboard offline: gunicorn is started with the
+Procfile's web options, Brevo/Fast2SMS calls are stubbed, and virtual users
+run scripted scenarios, reporting p50/p95/p99 latency and requests/sec.
+Usage: python manage.py loadtest --seed --scenario checkin poll search --users 4 --guards 8 --duration 30
+       python manage.py loadtest --cleanup
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from visitors.benchmarks import scenarios
+from visitors.benchmarks.seed import cleanup, seed
+from visitors.benchmarks.server import Server, procfile_options
+from visitors.models import Employee
+
+
+class Command(BaseCommand):
+    help = "Run offline load-test scenarios against gunicorn with stubbed providers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', action='store_true', help='Insert synthetic data first')
+        parser.add_argument('--employees', type=int, default=200)
+        parser.add_argument('--visitors', type=int, default=5000)
+        parser.add_argument('--visits', type=int, default=50000)
+        parser.add_argument('--scenario', nargs='+', choices=list(scenarios.SCENARIOS), default=list(scenarios.SCENARIOS))
+        parser.add_argument('--users', type=int, default=4, help='Concurrent kiosks for checkin')
+        parser.add_argument('--guards', type=int, default=8, help='Concurrent guards for poll and search')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds per scenario')
+        parser.add_argument('--think', type=float, default=0.0, help='Mean pause between iterations, seconds')
+        parser.add_argument('--provider-latency', type=float, default=0.05, help='Seconds each stubbed send takes')
+        parser.add_argument('--bind', default='127.0.0.1:8765')
+        parser.add_argument('--url', default='', help='Use an already running server instead of starting gunicorn')
+        parser.add_argument('--cleanup', action='store_true', help='Delete all synthetic rows and exit')
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            self.stdout.write(self.style.SUCCESS(f"Deleted {cleanup()} benchmark rows"))
+            return
+        if options['seed']:
+            result = seed(options['employees'], options['visitors'], options['visits'], guards=options['guards'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Seeded {result.employees} employees, {result.visitors} visitors, {result.visits} visits in {result.seconds:.1f}s"
+            ))
+        if not Employee.objects.filter(name__startswith='bench-').exists():
+            raise CommandError('No benchmark data. Run with --seed first.')
+
+        if options['url']:
+            if 'checkin' in options['scenario']:
+                # OTP codes are only visible to the stubbed provider of a server started here
+                raise CommandError('The checkin scenario needs the stubbed server; drop --url or the scenario.')
+            self.run_all(options['url'], options)
+            return
+        gunicorn = procfile_options()
+        self.stdout.write(f"gunicorn: {', '.join(f'{k}={v}' for k, v in sorted(gunicorn.items()))}; "
+                          f"stubbed providers take {options['provider_latency'] * 1000:.0f}ms")
+        with Server(options['bind'], options['provider_latency'], gunicorn) as server:
+            self.run_all(server.url, options, server.codes)
+
+    def run_all(self, url, options, codes=None):
+        for name in options['scenario']:
+            users = options['users'] if name == 'checkin' else options['guards']
+            report = scenarios.run(url, name, users, options['duration'], options['think'], options['guards'], codes)
+            self.write_report(report)
+
+    def write_report(self, report):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\n== {report.scenario}: {report.users} users, {report.seconds:.1f}s, "
+            f"{report.requests} requests, {report.throughput:.1f} req/s, {report.errors} errors =="
+        ))
+        self.stdout.write(f"{'step':<16} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for step in report.steps:
+            self.stdout.write(
+                f"{step.step:<16} {step.count:>7} {step.errors:>7} "
+                f"{step.p50 * 1000:>9.1f} {step.p95 * 1000:>9.1f} {step.p99 * 1000:>9.1f}"
+            )
@@ -0,0 +1,40 @@
+"""
+Delete expired rows from django_session in small batches, so a large backlog
+never holds one long DELETE against the live database. Run it daily (see the
+cron job in render.yaml); it is a no-op once SESSION_MODE=signed_cookies has
+emptied the table.
+Usage: python manage.py prune_sessions [--batch-size 5000] [--dry-run]
+"""
+import time
+
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+
+class Command(BaseCommand):
+    help = "Delete expired sessions from the database in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per statement')
+        parser.add_argument('--dry-run', action='store_true', help='Only count expired sessions')
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        expired = Session.objects.filter(expire_date__lt=now)
+        if options['dry_run']:
+            self.stdout.write(f"{expired.count()} of {Session.objects.count()} sessions expired")
+            return
+
+        started = time.perf_counter()
+        deleted = 0
+        while True:
+            # Each batch is its own autocommit statement, keyed by the primary key
+            keys = list(expired.values_list('session_key', flat=True)[:options['batch_size']])
+            if not keys:
+                break
+            deleted += Session.objects.filter(session_key__in=keys).delete()[0]
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} expired sessions in {time.perf_counter() - started:.1f}s, "
+            f"{Session.objects.count()} remain"
+        ))
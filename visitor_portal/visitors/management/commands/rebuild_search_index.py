@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from visitors.models import Visit
+from visitors.search import get_search_backend, refresh_search_documents
+
+
+class Command(BaseCommand):
+    help = "Recompute Visit search documents and rebuild the dashboard search index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Visits updated per batch')
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        updated = refresh_search_documents(Visit.objects.all(), batch_size=options['batch_size'])
+        indexed = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Search backend '{backend.name}': {updated} documents updated, {indexed} rows reindexed"
+        ))
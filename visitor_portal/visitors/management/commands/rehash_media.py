@@ -0,0 +1,80 @@
+"""
+Move visitor photos and ID scans to content-addressed names in the
+configured media storage, e.g. after switching MEDIA_STORAGE to s3.
+Usage: python manage.py rehash_media --source /path/to/old/media [--delete-originals]
+"""
+import time
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.management.base import BaseCommand
+
+from visitors.images import IMAGE_FIELDS
+from visitors.models import Visitor
+from visitors.storage import is_hashed_name
+
+
+class Command(BaseCommand):
+    help = "Rehash existing visitor images into the content-addressed media storage"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', type=str, default='', help='Directory holding the current files (default MEDIA_ROOT)')
+        parser.add_argument('--batch-size', type=int, default=500, help='Visitors updated per query')
+        parser.add_argument('--delete-originals', action='store_true', help='Remove source files once copied')
+
+    def handle(self, *args, **options):
+        source = FileSystemStorage(location=options['source'] or settings.MEDIA_ROOT)
+        fields = list(IMAGE_FIELDS)
+        started = time.perf_counter()
+        stored = {}  # source name -> content-addressed name
+        counts = dict.fromkeys(("files", "copied", "unchanged", "missing", "rows"), 0)
+
+        queryset = Visitor.objects.exclude(photo="", govt_id_image="").only("id", *fields).order_by("id")
+        batch = []
+        for visitor in queryset.iterator(chunk_size=options['batch_size']):
+            changed = False
+            for field in fields:
+                name = getattr(visitor, field).name
+                if not name:
+                    continue
+                if name not in stored:
+                    counts['files'] += 1
+                    stored[name] = self.rehash(source, name, counts)
+                if stored[name] and stored[name] != name:
+                    setattr(visitor, field, stored[name])
+                    changed = True
+            if changed:
+                batch.append(visitor)
+            if len(batch) >= options['batch_size']:
+                counts['rows'] += Visitor.objects.bulk_update(batch, fields)
+                batch = []
+        if batch:
+            counts['rows'] += Visitor.objects.bulk_update(batch, fields)
+
+        if options['delete_originals']:
+            for name, key in stored.items():
+                if key and key != name and source.exists(name):
+                    source.delete(name)
+
+        distinct = len({key for key in stored.values() if key})
+        self.stdout.write(self.style.SUCCESS(
+            f"{counts['files']} files -> {distinct} distinct blobs ({counts['copied']} copied, "
+            f"{counts['unchanged']} already in place), {counts['rows']} visitors updated "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
+        if counts['missing']:
+            self.stdout.write(self.style.WARNING(f"{counts['missing']} files referenced by visitors were not found"))
+
+    def rehash(self, source, name, counts):
+        # Already content-addressed and present: nothing to move
+        if is_hashed_name(name) and default_storage.exists(name):
+            counts['unchanged'] += 1
+            return name
+        if not source.exists(name):
+            counts['missing'] += 1
+            self.stdout.write(self.style.WARNING(f"Missing: {name}"))
+            return None
+        with source.open(name, 'rb') as f:
+            key = default_storage.save(name, f)
+        counts['copied'] += 1
+        return key
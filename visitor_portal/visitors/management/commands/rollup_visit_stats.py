@@ -0,0 +1,33 @@
+"""
+Rebuild the daily visit statistics from the Visit table, e.g. after
+deploying the rollup table or bulk-editing visits. Ending a visit keeps its
+day up to date on its own.
+Usage: python manage.py rollup_visit_stats [--since 2025-01-01] [--until 2025-12-31]
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from visitors.exports import parse_day
+from visitors.stats import backfill
+
+
+class Command(BaseCommand):
+    help = "Backfill the per-day visit statistics shown on the guard report page"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', type=str, default='', help='First day, YYYY-MM-DD (default: first visit)')
+        parser.add_argument('--until', type=str, default='', help='Last day, YYYY-MM-DD (default: today)')
+
+    def handle(self, *args, **options):
+        try:
+            since = parse_day(options['since'])
+            until = parse_day(options['until'])
+        except ValueError as e:
+            raise CommandError(f"Invalid date: {e}")
+        started = time.perf_counter()
+        result = backfill(since, until)
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled up {result.visits} visits into {result.rows} rows for {result.days} days "
+            f"in {time.perf_counter() - started:.1f}s"
+        ))
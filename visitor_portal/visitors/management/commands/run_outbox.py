@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from visitors.outbox import process_due, queue_depth
+
+
+class Command(BaseCommand):
+    help = "Deliver queued notifications from the outbox, retrying failures with backoff"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Process one batch and exit')
+        parser.add_argument('--batch', type=int, default=100, help='Messages claimed per batch')
+        parser.add_argument('--concurrency', type=int, default=4, help='Messages delivered in parallel')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when nothing is due')
+        parser.add_argument('--stats', action='store_true', help='Print queue depth and exit')
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            depth = queue_depth()
+            self.stdout.write(', '.join(f"{state}: {count}" for state, count in depth.items()))
+            return
+
+        while True:
+            result = process_due(limit=options['batch'], workers=options['concurrency'])
+            processed = result['sent'] + result['failed']
+            if processed:
+                self.stdout.write(f"Sent {result['sent']}, failed {result['failed']}, skipped {result['skipped']}")
+            if options['once']:
+                break
+            # Keep draining while full batches come back
+            if processed < options['batch']:
+                time.sleep(options['interval'])
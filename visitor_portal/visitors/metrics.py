@@ -0,0 +1,184 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional, Tuple
+
+from django.template.backends.django import DjangoTemplates
+
+
+# Upper bounds, Prometheus style; +Inf is implied
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+# name -> (help text, buckets)
+METRICS = {
+    "visitor_request_seconds": ("Wall time of each request by view", SECONDS_BUCKETS),
+    "visitor_request_db_queries": ("Database queries issued by each request", QUERY_BUCKETS),
+    "visitor_request_db_seconds": ("Time spent in database queries by each request", SECONDS_BUCKETS),
+    "visitor_template_render_seconds": ("Time spent rendering each template", SECONDS_BUCKETS),
+    "visitor_provider_seconds": ("Latency of calls to outbound providers", SECONDS_BUCKETS),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * (size + 1)
+        self.total = 0.0
+        self.count = 0
+
+
+class Registry:
+    """In-process histograms, rendered in the Prometheus text format.
+
+    Each gunicorn worker keeps its own numbers; with one worker (the
+    default deployment) a scrape sees everything.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, Labels], _Histogram] = {}
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        buckets = METRICS[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(len(buckets))
+            histogram.counts[bisect_left(buckets, value)] += 1
+            histogram.total += value
+            histogram.count += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self) -> str:
+        with self._lock:
+            snapshot = sorted(
+                (name, labels, list(h.counts), h.total, h.count) for (name, labels), h in self._histograms.items()
+            )
+        lines = []
+        current = None
+        for name, labels, counts, total, count in snapshot:
+            help_text, buckets = METRICS[name]
+            if name != current:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                current = name
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {total:.6f}")
+            lines.append(f"{name}_count{_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (f'{k}="{_escape(v)}"' for k, v in labels)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = Registry()
+
+
+class RequestTimings:
+    """What one request spent its time on, for the Server-Timing header."""
+
+    __slots__ = ("db_queries", "db_seconds", "template_seconds", "provider_seconds")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.provider_seconds = 0.0
+
+    def server_timing(self, total: float) -> str:
+        return ", ".join([
+            f'db;dur={self.db_seconds * 1000:.1f};desc="{self.db_queries} queries"',
+            f"tpl;dur={self.template_seconds * 1000:.1f}",
+            f"ext;dur={self.provider_seconds * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ])
+
+
+_current: ContextVar[Optional[RequestTimings]] = ContextVar("visitor_request_timings", default=None)
+
+
+def start_request() -> Tuple[RequestTimings, object]:
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token) -> None:
+    _current.reset(token)
+
+
+def db_wrapper(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook counting the current request's queries."""
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings = _current.get()
+        if timings is not None:
+            timings.db_queries += 1
+            timings.db_seconds += time.perf_counter() - started
+
+
+@contextmanager
+def observe_provider(provider: str):
+    """Time one call to an outbound provider (Brevo, Fast2SMS, S3)."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        registry.observe("visitor_provider_seconds", elapsed, provider=provider, outcome=outcome)
+        timings = _current.get()
+        if timings is not None:
+            timings.provider_seconds += elapsed
+
+
+class _TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            elapsed = time.perf_counter() - started
+            registry.observe("visitor_template_render_seconds", elapsed, template=self.template.origin.template_name or "")
+            timings = _current.get()
+            if timings is not None:
+                timings.template_seconds += elapsed
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """The Django template engine, timing each top-level render."""
+
+    def from_string(self, template_code):
+        return _TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return _TimedTemplate(super().get_template(template_name))
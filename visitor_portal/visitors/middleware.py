@@ -1,6 +1,48 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
 from django.shortcuts import redirect
 from django.urls import reverse
 
+from .metrics import db_wrapper, end_request, registry, start_request
+
+
+class RequestMetricsMiddleware:
+    """
+    Record wall time, database queries and template/provider time per view.
+    Numbers go to the Prometheus registry served at /control/metrics/ and,
+    when METRICS_SERVER_TIMING is on, to a Server-Timing header that the
+    browser's network panel shows for each request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        timings, token = start_request()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(db_wrapper))
+                response = self.get_response(request)
+        finally:
+            end_request(token)
+        elapsed = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match else "<unresolved>"
+        labels = {"view": view, "method": request.method, "status": f"{response.status_code // 100}xx"}
+        registry.observe("visitor_request_seconds", elapsed, **labels)
+        registry.observe("visitor_request_db_queries", timings.db_queries, view=view)
+        registry.observe("visitor_request_db_seconds", timings.db_seconds, view=view)
+        # Streamed bodies run after this returns; the header covers the time to the first byte
+        if getattr(settings, "METRICS_SERVER_TIMING", True):
+            response["Server-Timing"] = timings.server_timing(elapsed)
+        return response
+
 
 class AdminAccessMiddleware:
     """
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitors', '0003_visitor_email'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['status', '-started_at'], name='visit_status_started_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['status', '-ended_at'], name='visit_status_ended_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(condition=models.Q(('status', 'ongoing')), fields=['-started_at'], name='visit_ongoing_started_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['-started_at'], name='visit_started_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(fields=['employee', '-started_at'], name='visit_employee_started_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.2.6 on 2026-10-18 06:57
+
+import re
+
+from django.db import migrations, models
+
+
+FTS_TABLE = 'visitors_visit_fts'
+
+
+def backfill_search_document(apps, schema_editor):
+    Visit = apps.get_model('visitors', 'Visit')
+    batch = []
+    for visit in Visit.objects.select_related('visitor', 'employee').iterator(chunk_size=1000):
+        parts = [
+            visit.visitor.full_name,
+            visit.visitor.phone,
+            re.sub(r'\D', '', visit.visitor.phone or ''),
+            visit.employee.name,
+            visit.employee.department,
+            visit.purpose,
+        ]
+        visit.search_document = ' '.join(p.strip() for p in parts if p and p.strip())
+        batch.append(visit)
+        if len(batch) >= 1000:
+            Visit.objects.bulk_update(batch, ['search_document'])
+            batch = []
+    if batch:
+        Visit.objects.bulk_update(batch, ['search_document'])
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.indexes import GinIndex
+        from django.contrib.postgres.search import SearchVector
+
+        Visit = apps.get_model('visitors', 'Visit')
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.add_index(Visit, GinIndex(SearchVector('search_document', config='simple'), name='visit_search_tsv_idx'))
+        schema_editor.add_index(Visit, GinIndex(fields=['search_document'], opclasses=['gin_trgm_ops'], name='visit_search_trgm_idx'))
+    elif connection.vendor == 'sqlite':
+        # FTS5 with the trigram tokenizer needs SQLite 3.34+; otherwise the
+        # basic search backend is used
+        if connection.Database.sqlite_version_info < (3, 34, 0):
+            return
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(search_document, tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, search_document) SELECT id, search_document FROM visitors_visit'
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS visit_search_tsv_idx')
+        schema_editor.execute('DROP INDEX IF EXISTS visit_search_trgm_idx')
+    elif connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitors', '0004_visit_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visit',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(backfill_search_document, migrations.RunPython.noop),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
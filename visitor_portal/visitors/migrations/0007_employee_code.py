@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitors', '0006_outboundmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='employee',
+            name='employee_code',
+            field=models.CharField(blank=True, max_length=40, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='employee',
+            name='name',
+            field=models.CharField(db_index=True, max_length=120),
+        ),
+    ]
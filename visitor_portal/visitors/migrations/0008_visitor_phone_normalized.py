@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:18
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitors', '0007_employee_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visitor',
+            name='phone_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='visitor',
+            index=models.Index(django.db.models.functions.text.Lower('email'), name='visitor_email_lower_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitors', '0008_visitor_phone_normalized'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyVisitStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('department', models.CharField(blank=True, max_length=120)),
+                ('visits', models.PositiveIntegerField(default=0)),
+                ('total_duration_seconds', models.BigIntegerField(default=0)),
+                ('p95_duration_seconds', models.PositiveIntegerField(default=0)),
+                ('peak_concurrent', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='visitors.employee')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('employee__isnull', False)), fields=('day', 'employee'), name='daily_stats_day_employee_uniq'), models.UniqueConstraint(condition=models.Q(('employee__isnull', True)), fields=('day',), name='daily_stats_day_total_uniq')],
+            },
+        ),
+    ]
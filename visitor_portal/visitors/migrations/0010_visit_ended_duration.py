@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:46
+
+import visitors.durations
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitors', '0009_daily_visit_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='visit',
+            name='ended_duration_seconds',
+            field=models.GeneratedField(db_persist=True, expression=visitors.durations.SecondsBetween(models.F('started_at'), models.F('ended_at')), output_field=models.BigIntegerField(null=True)),
+        ),
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(condition=models.Q(('ended_duration_seconds__isnull', False)), fields=['-ended_duration_seconds'], name='visit_duration_idx'),
+        ),
+    ]
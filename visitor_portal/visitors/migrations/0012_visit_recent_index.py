@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:59
+
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitors', '0011_employee_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='visit',
+            index=models.Index(models.OrderBy(django.db.models.functions.comparison.Coalesce('ended_at', 'started_at'), descending=True), models.OrderBy(models.F('id'), descending=True), condition=models.Q(('status', 'ended')), name='visit_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+OTP_SUBJECT = 'Your Verification Code'
+
+
+def purge_otp_messages(apps, schema_editor):
+    # OTP emails no longer go through the outbox; drop the rows that kept
+    # their codes in plain text
+    OutboundMessage = apps.get_model('visitors', 'OutboundMessage')
+    OutboundMessage.objects.filter(channel='email', subject=OTP_SUBJECT).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('visitors', '0012_visit_recent_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(purge_otp_messages, migrations.RunPython.noop),
+    ]
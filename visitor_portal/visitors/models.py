@@ -1,13 +1,21 @@
 from django.db import models
+from django.db.models.functions import Coalesce, Lower
+from django.urls import reverse
 from django.utils import timezone
 
+from .durations import SecondsBetween
+
 
 class Employee(models.Model):
-    name = models.CharField(max_length=120)
+    name = models.CharField(max_length=120, db_index=True)
+    # Id from the HR system; the import key when the CSV provides it
+    employee_code = models.CharField(max_length=40, unique=True, blank=True, null=True)
     phone = models.CharField(max_length=20)
     email = models.EmailField(blank=True)
     department = models.CharField(max_length=120, blank=True)
     active = models.BooleanField(default=True)
+    # Part of the employee directory's change stamp; bulk writes set it by hand
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self) -> str:
         return f"{self.name} ({self.department})" if self.department else self.name
@@ -23,6 +31,10 @@ class Visitor(models.Model):
 
     full_name = models.CharField(max_length=120)
     phone = models.CharField(max_length=20)
+    # E.164 form of phone, the identity a returning visitor is matched on.
+    # Set on save; rows left over from before deduplication keep it empty
+    # until dedupe_visitors merges them
+    phone_normalized = models.CharField(max_length=20, unique=True, blank=True, null=True, editable=False)
     email = models.EmailField(blank=True)
     address = models.TextField()
     photo = models.ImageField(upload_to="visitor_photos/", blank=True, null=True)
@@ -30,10 +42,29 @@ class Visitor(models.Model):
     govt_id_image = models.ImageField(upload_to="visitor_ids/", blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Returning visitors are looked up by their OTP-verified email
+            models.Index(Lower("email"), name="visitor_email_lower_idx"),
+        ]
+
+    @property
+    def photo_thumbnail_url(self) -> str:
+        return _thumbnail_url(self.photo)
+
+    @property
+    def govt_id_thumbnail_url(self) -> str:
+        return _thumbnail_url(self.govt_id_image)
+
     def __str__(self) -> str:
         return self.full_name
 
 
+def _thumbnail_url(image) -> str:
+    # Served (and made on first request if need be) by visitors.views.visitor_thumbnail
+    return reverse("visitor_thumbnail", args=[image.name]) if image else ""
+
+
 class Visit(models.Model):
     STATUS_CHOICES = [
         ("pending", "Pending"),
@@ -49,6 +80,41 @@ class Visit(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="ongoing")
     sms_sent_at = models.DateTimeField(blank=True, null=True)
     notes = models.TextField(blank=True)
+    # Denormalized visitor/employee/purpose text for the dashboard search backends
+    search_document = models.TextField(blank=True, editable=False)
+    # Computed by the database once the visit ends, so lists can sort and
+    # filter by duration in SQL; reload the row to see it after saving
+    ended_duration_seconds = models.GeneratedField(
+        expression=SecondsBetween(models.F("started_at"), models.F("ended_at")),
+        output_field=models.BigIntegerField(null=True),
+        db_persist=True,
+    )
+
+    class Meta:
+        indexes = [
+            # Dashboard: ongoing list, recent list and month filters
+            models.Index(fields=["status", "-started_at"], name="visit_status_started_idx"),
+            models.Index(fields=["status", "-ended_at"], name="visit_status_ended_idx"),
+            models.Index(
+                Coalesce("ended_at", "started_at").desc(), models.F("id").desc(),
+                name="visit_recent_idx",
+                condition=models.Q(status="ended"),
+            ),
+            models.Index(
+                fields=["-started_at"],
+                name="visit_ongoing_started_idx",
+                condition=models.Q(status="ongoing"),
+            ),
+            # Admin list: default ordering and employee filter
+            models.Index(fields=["-started_at"], name="visit_started_idx"),
+            models.Index(fields=["employee", "-started_at"], name="visit_employee_started_idx"),
+            # Long visits report and admin duration filter
+            models.Index(
+                fields=["-ended_duration_seconds"],
+                name="visit_duration_idx",
+                condition=models.Q(ended_duration_seconds__isnull=False),
+            ),
+        ]
 
     @property
     def duration_seconds(self) -> int:
@@ -59,4 +125,69 @@ class Visit(models.Model):
     def __str__(self) -> str:
         return f"Visit: {self.visitor} -> {self.employee} ({self.status})"
 
-# Create your models here.
+
+class OutboundMessage(models.Model):
+    """Durable outbox row for an email/SMS/WhatsApp notification."""
+
+    CHANNEL_CHOICES = [
+        ("email", "Email"),
+        ("sms", "SMS"),
+        ("whatsapp", "WhatsApp"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("sending", "Sending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, default="email")
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField()
+    visit = models.ForeignKey(Visit, on_delete=models.SET_NULL, blank=True, null=True, related_name="messages")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=6)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    provider_message_id = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_status_due_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.get_channel_display()} to {self.recipient} ({self.status})"
+
+
+class DailyVisitStats(models.Model):
+    """Per-day rollup of ended visits, maintained by ``visitors.stats``.
+
+    One row per employee visited that day, plus a site-wide row with no
+    employee. A visit belongs to the local (TIME_ZONE) date it started on.
+    """
+
+    day = models.DateField()
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, blank=True, null=True, related_name="daily_stats")
+    department = models.CharField(max_length=120, blank=True)
+    visits = models.PositiveIntegerField(default=0)
+    total_duration_seconds = models.BigIntegerField(default=0)
+    p95_duration_seconds = models.PositiveIntegerField(default=0)
+    peak_concurrent = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "employee"], condition=models.Q(employee__isnull=False), name="daily_stats_day_employee_uniq",
+            ),
+            models.UniqueConstraint(fields=["day"], condition=models.Q(employee__isnull=True), name="daily_stats_day_total_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.day} {self.employee or 'all'}: {self.visits} visits"
@@ -0,0 +1,116 @@
+import hashlib
+import hmac
+import secrets
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+CODE_LENGTH = 6
+
+
+class RateLimited(Exception):
+    """Too many OTP requests from one email address or client IP."""
+
+    def __init__(self, retry_after: int):
+        self.retry_after = retry_after
+        super().__init__(f"Too many attempts, retry in {retry_after}s")
+
+
+def _cache():
+    return caches[getattr(settings, "OTP_CACHE", "default")]
+
+
+def _key(kind: str, value: str) -> str:
+    # Hashed so cache keys never hold an address and stay within key-length limits
+    return f"otp:{kind}:{hashlib.sha256(value.encode()).hexdigest()[:32]}"
+
+
+def _digest(email: str, code: str) -> str:
+    return hmac.new(settings.SECRET_KEY.encode(), f"{email}:{code}".encode(), hashlib.sha256).hexdigest()
+
+
+def normalize_email(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+def client_ip(request) -> str:
+    """The client address, looking past TRUSTED_PROXY_COUNT reverse proxies."""
+    proxies = getattr(settings, "TRUSTED_PROXY_COUNT", 0)
+    forwarded = [ip.strip() for ip in request.META.get("HTTP_X_FORWARDED_FOR", "").split(",") if ip.strip()]
+    if proxies and len(forwarded) >= proxies:
+        return forwarded[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _window() -> int:
+    return getattr(settings, "OTP_RATE_WINDOW_SECONDS", 900)
+
+
+def _hit(kind: str, value: str, limit: int) -> None:
+    """Count one attempt in a fixed window; raise RateLimited past ``limit``."""
+    if not value or limit <= 0:
+        return
+    cache = _cache()
+    window = _window()
+    key = _key(kind, f"{value}:{int(time.time()) // window}")
+    # add() then incr() is atomic on Redis and memcached; locmem locks both
+    cache.add(key, 0, window)
+    try:
+        count = cache.incr(key)
+    except ValueError:  # expired between add() and incr()
+        cache.add(key, 1, window)
+        count = 1
+    if count > limit:
+        raise RateLimited(window - int(time.time()) % window)
+
+
+def issue_code(email: str, ip: str = "") -> str:
+    """Create a new code for ``email``, replacing any earlier one.
+
+    Raises RateLimited when the address or client has asked for too many
+    codes in the current window. Only an HMAC of the code is cached.
+    """
+    email = normalize_email(email)
+    _hit("send-email", email, getattr(settings, "OTP_SENDS_PER_EMAIL", 5))
+    _hit("send-ip", ip, getattr(settings, "OTP_SENDS_PER_IP", 20))
+    code = f"{secrets.randbelow(10 ** CODE_LENGTH):0{CODE_LENGTH}d}"
+    ttl = getattr(settings, "OTP_TTL_SECONDS", 300)
+    cache = _cache()
+    cache.set(_key("code", email), _digest(email, code), ttl)
+    cache.delete(_key("fails", email))
+    return code
+
+
+def verify_code(email: str, code: str, ip: str = "", consume: bool = False) -> bool:
+    """Check ``code`` against the one issued for ``email``.
+
+    The comparison is constant-time. After OTP_MAX_ATTEMPTS wrong codes
+    the issued one is void and a new code must be requested. ``consume``
+    deletes a correct code so it cannot be used twice.
+    """
+    email = normalize_email(email)
+    code = (code or "").strip()
+    _hit("verify-ip", ip, getattr(settings, "OTP_VERIFIES_PER_IP", 60))
+    cache = _cache()
+    expected: Optional[str] = cache.get(_key("code", email))
+    if expected is None or not code:
+        return False
+    if not hmac.compare_digest(expected, _digest(email, code)):
+        fails_key = _key("fails", email)
+        cache.add(fails_key, 0, getattr(settings, "OTP_TTL_SECONDS", 300))
+        try:
+            fails = cache.incr(fails_key)
+        except ValueError:
+            fails = 1
+        if fails >= getattr(settings, "OTP_MAX_ATTEMPTS", 5):
+            cache.delete_many([_key("code", email), fails_key])
+        return False
+    if consume:
+        # Only the request that deletes the code gets to use it
+        used = cache.delete(_key("code", email))
+        cache.delete(_key("fails", email))
+        return used
+    return True
@@ -0,0 +1,355 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from .models import OutboundMessage, Visit
+
+
+# A "sending" row older than this is assumed orphaned by a crashed worker
+STALE_LOCK = timedelta(minutes=5)
+BASE_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 3600
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class CircuitBreaker:
+    """Stop calling a provider that keeps failing.
+
+    After ``threshold`` consecutive failures the breaker opens and messages
+    for that channel stay queued without being attempted. Once
+    ``reset_seconds`` have passed a single trial call is let through; its
+    outcome closes the breaker or opens it again. State is per process,
+    which is what keeps a worker from tying up its threads on timeouts.
+    """
+
+    def __init__(self, name: str, threshold: int = 5, reset_seconds: float = 60):
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self.opened_at >= self.reset_seconds
+
+    def available(self) -> bool:
+        """Whether a call could be allowed now, without reserving it."""
+        with self._lock:
+            return self.opened_at is None or (not self._trial and self._cooled_down())
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self._trial or not self._cooled_down():
+                return False
+            self._trial = True
+            return True
+
+    def cancel(self) -> None:
+        """Give back an allowed call that never reached the provider."""
+        with self._lock:
+            self._trial = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                print(f"✅ {self.name} circuit closed")
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._trial or (self.opened_at is None and self.failures >= self.threshold):
+                print(f"⚠️ {self.name} circuit open for {self.reset_seconds:.0f}s after {self.failures} failures")
+                self.opened_at = time.monotonic()
+            self._trial = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(channel: str) -> CircuitBreaker:
+    """One breaker per channel, since each channel has its own provider credentials."""
+    breaker = _breakers.get(channel)
+    if breaker is None:
+        breaker = _breakers.setdefault(channel, CircuitBreaker(
+            channel,
+            threshold=getattr(settings, "OUTBOX_BREAKER_THRESHOLD", 5),
+            reset_seconds=getattr(settings, "OUTBOX_BREAKER_RESET_SECONDS", 60),
+        ))
+    return breaker
+
+
+def enqueue_message(channel: str, recipient: str, body: str, subject: str = "", visit=None,
+                    max_attempts: Optional[int] = None) -> OutboundMessage:
+    """Persist a notification and try to deliver it right after commit.
+
+    The row is the source of truth: if the inline attempt fails or the
+    process restarts, ``run_outbox`` picks it up and retries with backoff.
+    """
+    message = OutboundMessage.objects.create(
+        channel=channel,
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        visit=visit,
+        **({"max_attempts": max_attempts} if max_attempts else {}),
+    )
+    transaction.on_commit(lambda: _dispatch_inline(message.pk))
+    return message
+
+
+def enqueue_many(channel: str, recipients: Iterable[str], body: str, subject: str = "") -> int:
+    """Queue the same message for many recipients in one insert.
+
+    No inline attempt is made, so the worker can send SMS and WhatsApp
+    copies as a few multi-recipient requests.
+    """
+    messages = [
+        OutboundMessage(channel=channel, recipient=recipient, subject=subject, body=body)
+        for recipient in dict.fromkeys(recipients)
+    ]
+    return len(OutboundMessage.objects.bulk_create(messages, batch_size=500))
+
+
+def _inline_executor() -> Optional[ThreadPoolExecutor]:
+    """Bounded pool for first delivery attempts from the web process."""
+    global _executor
+    workers = getattr(settings, "OUTBOX_INLINE_WORKERS", 2)
+    if workers <= 0:
+        return None
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outbox")
+    return _executor
+
+
+def _dispatch_inline(pk: int) -> None:
+    executor = _inline_executor()
+    if executor is not None:
+        executor.submit(_run, pk)
+
+
+def _run(pk: int) -> Optional[bool]:
+    close_old_connections()
+    try:
+        return process_message(pk)
+    except Exception as e:
+        print(f"❌ Outbox message {pk} crashed: {e}")
+        return False
+    finally:
+        close_old_connections()
+
+
+def _run_batch(pks: List[int]) -> List[Optional[bool]]:
+    close_old_connections()
+    try:
+        return process_text_batch(pks)
+    except Exception as e:
+        print(f"❌ Outbox batch of {len(pks)} crashed: {e}")
+        return [False] * len(pks)
+    finally:
+        close_old_connections()
+
+
+def _due(now) -> Q:
+    return Q(status="pending", next_attempt_at__lte=now) | Q(status="sending", locked_at__lt=now - STALE_LOCK)
+
+
+def claim(pk: int) -> Optional[OutboundMessage]:
+    """Atomically take ownership of a due message; None if someone else has it."""
+    now = timezone.now()
+    if not OutboundMessage.objects.filter(_due(now), pk=pk).update(status="sending", locked_at=now):
+        return None
+    return OutboundMessage.objects.get(pk=pk)
+
+
+def deliver(message: OutboundMessage) -> str:
+    """Hand one message to its provider; returns the provider id or raises."""
+    if message.channel == "email":
+        from .email import deliver_email
+        return deliver_email(message.recipient, message.subject, message.body)
+
+    from .sms import send_bulk
+    results = send_bulk(message.channel, [message.recipient], message.body)
+    if not results:
+        raise ValueError(f"Invalid phone number: {message.recipient}")
+    if not results[0].ok:
+        raise RuntimeError(results[0].error)
+    return results[0].request_id
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Exponential backoff with +/-20% jitter so retries do not bunch up."""
+    delay = min(BASE_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0), MAX_BACKOFF_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _mark_sent(messages: List[OutboundMessage], provider_id) -> None:
+    now = timezone.now()
+    OutboundMessage.objects.filter(pk__in=[m.pk for m in messages]).update(
+        status="sent",
+        attempts=F("attempts") + 1,
+        locked_at=None,
+        sent_at=now,
+        last_error="",
+        provider_message_id=str(provider_id or "")[:255],
+    )
+    visit_ids = [m.visit_id for m in messages if m.visit_id]
+    if visit_ids:
+        Visit.objects.filter(pk__in=visit_ids, sms_sent_at__isnull=True).update(sms_sent_at=now)
+    for m in messages:
+        print(f"✅ {m.get_channel_display()} sent to {m.recipient} (Message ID: {provider_id})")
+
+
+def _release(messages: List[OutboundMessage]) -> None:
+    """Put claimed messages back without counting an attempt."""
+    OutboundMessage.objects.filter(pk__in=[m.pk for m in messages], status="sending").update(
+        status="pending", locked_at=None,
+    )
+
+
+def _mark_failed(message: OutboundMessage, error: str, final: bool = False) -> None:
+    attempts = message.attempts + 1
+    final = final or attempts >= message.max_attempts
+    OutboundMessage.objects.filter(pk=message.pk).update(
+        status="failed" if final else "pending",
+        attempts=attempts,
+        locked_at=None,
+        last_error=error[:2000],
+        next_attempt_at=timezone.now() + timedelta(seconds=backoff_seconds(attempts)),
+    )
+    print(f"❌ {message.get_channel_display()} to {message.recipient} failed (attempt {attempts}): {error}")
+
+
+def process_message(pk: int) -> Optional[bool]:
+    """Claim and attempt one message. True if sent, False if it failed, None if not claimed."""
+    message = claim(pk)
+    if message is None:
+        return None
+    breaker = get_breaker(message.channel)
+    if not breaker.allow():
+        _release([message])
+        return None
+    try:
+        provider_id = deliver(message)
+    except ValueError as e:
+        # Bad recipient or content: the provider is fine, retrying will not help
+        breaker.cancel()
+        _mark_failed(message, str(e), final=True)
+        return False
+    except Exception as e:
+        breaker.record_failure()
+        _mark_failed(message, str(e))
+        return False
+    breaker.record_success()
+    _mark_sent([message], provider_id)
+    return True
+
+
+def process_text_batch(pks: List[int]) -> List[Optional[bool]]:
+    """Claim SMS/WhatsApp messages and send identical texts as one request each.
+
+    Broadcasts (evacuation notices, host reminders) become a handful of
+    multi-recipient bulkV2 calls instead of one call per person.
+    """
+    from .sms import provider_number, send_numbers
+
+    now = timezone.now()
+    # locked_at doubles as a claim token for this batch
+    OutboundMessage.objects.filter(_due(now), pk__in=pks).update(status="sending", locked_at=now)
+    claimed = list(OutboundMessage.objects.filter(pk__in=pks, status="sending", locked_at=now))
+
+    outcome: Dict[int, Optional[bool]] = {}
+    groups: Dict[tuple, Dict[str, List[OutboundMessage]]] = {}
+    for message in claimed:
+        number = provider_number(message.channel, message.recipient)
+        if number is None:
+            _mark_failed(message, f"Invalid phone number: {message.recipient}", final=True)
+            outcome[message.pk] = False
+            continue
+        groups.setdefault((message.channel, message.body), {}).setdefault(number, []).append(message)
+
+    for (channel, body), by_number in groups.items():
+        breaker = get_breaker(channel)
+        if not breaker.allow():
+            _release([m for group in by_number.values() for m in group])
+            continue
+        for result in send_numbers(channel, by_number, body):
+            batch = [m for number in result.numbers for m in by_number.pop(number, [])]
+            if result.ok:
+                breaker.record_success()
+                _mark_sent(batch, result.request_id)
+            else:
+                breaker.record_failure()
+                for message in batch:
+                    _mark_failed(message, result.error)
+            outcome.update((m.pk, result.ok) for m in batch)
+        # Never left in "sending" for the stale-lock reclaim to send again
+        for message in (m for group in by_number.values() for m in group):
+            _mark_failed(message, "Not included in any provider request")
+            outcome[message.pk] = False
+    return [outcome.get(pk) for pk in pks]
+
+
+def process_due(limit: int = 100, workers: int = 4) -> Dict[str, int]:
+    """Attempt up to ``limit`` due messages.
+
+    Providers are worked on concurrently: emails go out individually on the
+    pool of ``workers`` threads while SMS and WhatsApp messages, coalesced by
+    text into bulk requests, each take one thread. Channels whose circuit is
+    open are left queued.
+    """
+    blocked = [channel for channel, _ in OutboundMessage.CHANNEL_CHOICES if not get_breaker(channel).available()]
+    rows = list(
+        OutboundMessage.objects.filter(_due(timezone.now()))
+        .exclude(channel__in=blocked)
+        .order_by("next_attempt_at")
+        .values_list("pk", "channel")[:limit]
+    )
+    email_pks = [pk for pk, channel in rows if channel == "email"]
+    text_batches = [
+        [pk for pk, c in rows if c == channel] for channel in ("sms", "whatsapp")
+    ]
+    text_batches = [pks for pks in text_batches if pks]
+
+    if workers <= 1:
+        results = [r for pks in text_batches for r in process_text_batch(pks)]
+        results += [process_message(pk) for pk in email_pks]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="outbox") as pool:
+            batch_futures = [pool.submit(_run_batch, pks) for pks in text_batches]
+            results = list(pool.map(_run, email_pks))
+            results += [r for future in batch_futures for r in future.result()]
+    return {
+        "sent": results.count(True),
+        "failed": results.count(False),
+        "skipped": results.count(None),
+    }
+
+
+def queue_depth() -> Dict[str, int]:
+    """Outbox counts by state, in one query."""
+    now = timezone.now()
+    return OutboundMessage.objects.aggregate(
+        pending=Count("pk", filter=Q(status="pending")),
+        due=Count("pk", filter=_due(now)),
+        sending=Count("pk", filter=Q(status="sending")),
+        failed=Count("pk", filter=Q(status="failed")),
+    )
@@ -0,0 +1,94 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Sequence
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db import models
+from django.db.models import Q, QuerySet
+
+
+class KeysetPage(NamedTuple):
+    items: List
+    next_cursor: Optional[str]
+
+
+def encode_cursor(values: Sequence) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+# JSON type a cursor value must have, by its ordering field's class
+_CURSOR_TYPES = (
+    (models.DateTimeField, str),  # ISO 8601
+    (models.IntegerField, int),  # includes the auto id fields
+    (models.FloatField, (int, float)),
+    (models.CharField, str),
+    (models.TextField, str),
+)
+
+
+def _output_field(queryset: QuerySet, name: str):
+    annotation = queryset.query.annotations.get(name)
+    if annotation is not None:
+        return annotation.output_field
+    try:
+        return queryset.model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+
+
+def decode_cursor(cursor: str, queryset: QuerySet, fields: Sequence[str]) -> list:
+    """Decode a cursor produced by ``encode_cursor`` for the given ordering
+    fields or annotations of ``queryset``.
+
+    Raises ValueError on malformed input.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw.decode("utf-8"))
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if not isinstance(values, list) or len(values) != len(fields):
+        raise ValueError("Invalid cursor")
+    decoded = []
+    for name, value in zip(fields, values):
+        field = _output_field(queryset, name)
+        expected = next((types for cls, types in _CURSOR_TYPES if isinstance(field, cls)), (str, int, float))
+        # None, lists and objects never reach the ORM; nor does a bool posing as an int
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError("Invalid cursor")
+        if isinstance(field, models.DateTimeField):
+            value = datetime.fromisoformat(value)
+        decoded.append(value)
+    return decoded
+
+
+def keyset_paginate(queryset: QuerySet, ordering: Sequence[str], cursor: Optional[str], size: int) -> KeysetPage:
+    """Return one page of ``queryset`` ordered by ``ordering`` after ``cursor``.
+
+    ``ordering`` must end with a unique field (normally ``-id``) and name only
+    non-null fields or annotations (Coalesce a nullable column) so every row
+    has a distinct, comparable position. Instead of OFFSET the next page is selected with
+    a row-value comparison against the last row seen, which stays cheap on
+    an index however deep the guard scrolls.
+    """
+    fields = [name.lstrip("-") for name in ordering]
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset, fields)
+        after = Q()
+        for i, name in enumerate(ordering):
+            op = "lt" if name.startswith("-") else "gt"
+            step = Q(**{f"{fields[i]}__{op}": values[i]})
+            for j in range(i):
+                step &= Q(**{fields[j]: values[j]})
+            after |= step
+        queryset = queryset.filter(after)
+
+    items = list(queryset[:size + 1])
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = encode_cursor([getattr(items[-1], f) for f in fields])
+    return KeysetPage(items, next_cursor)
@@ -0,0 +1,72 @@
+import re
+from functools import lru_cache
+from typing import Iterable, List, Optional
+
+
+DEFAULT_COUNTRY = "IN"
+
+_NON_DIGIT_RE = re.compile(r"[^0-9]")
+
+
+def digits_only(raw) -> str:
+    """Strip everything but ASCII digits, e.g. for search documents."""
+    s = str(raw or "")
+    # Most stored numbers are already bare digits; skip the regex for them
+    return s if s.isdigit() and s.isascii() else _NON_DIGIT_RE.sub("", s)
+
+
+def _normalize(raw, default_country: str = DEFAULT_COUNTRY) -> Optional[str]:
+    if not raw:
+        return None
+    s = str(raw).strip()
+    # Keep leading +, remove other non-digits
+    if s.startswith('+'):
+        digits = digits_only(s[1:])
+        # Must be + followed by 10-15 digits
+        return '+' + digits if 10 <= len(digits) <= 15 else None
+
+    # Remove all non-digits, then trim leading zeros
+    digits = digits_only(s).lstrip('0')
+    if not digits:
+        return None
+
+    # India heuristics
+    if default_country.upper() == 'IN':
+        if len(digits) == 10:
+            return "+91" + digits
+        if len(digits) == 12 and digits.startswith('91'):
+            return "+" + digits
+
+    # Fallback: if looks like countrycode+number in 10..15 digits, prefix '+'
+    if 10 <= len(digits) <= 15:
+        return "+" + digits
+    return None
+
+
+@lru_cache(maxsize=4096)
+def normalize_phone(raw, default_country: str = DEFAULT_COUNTRY) -> Optional[str]:
+    """Return E.164 phone or None if cannot normalize.
+
+    Current logic favors India (+91):
+    - Accepts +E164 as-is (digits only after '+').
+    - Strips spaces/dashes/parentheses.
+    - If starts with '0', trim leading zeros.
+    - If 10 digits, assume Indian local and prefix +91.
+    - If starts with 91 and total 12 digits, prefix '+'.
+    - Basic length guard: 10..15 digits after country code.
+
+    Results are memoized since the same few numbers (employees, returning
+    visitors) are normalized over and over.
+    """
+    return _normalize(raw, default_country)
+
+
+def normalize_phones(values: Iterable, default_country: str = DEFAULT_COUNTRY) -> List[Optional[str]]:
+    """Normalize a whole column (CSV import, export, dedup job) in one pass.
+
+    Each distinct value is normalized once. The shared LRU cache is
+    bypassed so a large import does not evict the hot numbers.
+    """
+    values = list(values)
+    normalized = {value: _normalize(value, default_country) for value in dict.fromkeys(values)}
+    return [normalized[value] for value in values]
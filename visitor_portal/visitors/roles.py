@@ -0,0 +1,48 @@
+from typing import FrozenSet
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Exists, OuterRef
+
+
+GUARD_GROUP = "Guard"
+
+
+def user_roles(user) -> FrozenSet[str]:
+    """Names of the groups ``user`` belongs to.
+
+    Memoized on the user object, which lives for one request.
+    """
+    if not user.is_authenticated:
+        return frozenset()
+    roles = getattr(user, "_visitor_roles", None)
+    if roles is None:
+        roles = frozenset(user.groups.values_list("name", flat=True))
+        user._visitor_roles = roles
+    return roles
+
+
+def is_guard(user) -> bool:
+    if not user.is_authenticated:
+        return False
+    if user.is_superuser:
+        return True
+    # Set by CachedModelBackend when it loads the logged-in user
+    member = getattr(user, "is_guard_member", None)
+    return member if member is not None else GUARD_GROUP in user_roles(user)
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend that loads the logged-in user and their guard
+    membership in one query.
+
+    Nothing is cached between requests: users are deactivated, reset and
+    regrouped by ``manage_users`` in another process, and the next request
+    must see it. (The name is kept so existing sessions stay valid.)
+    """
+
+    def get_user(self, user_id):
+        UserModel = get_user_model()
+        guard = UserModel.groups.through.objects.filter(user_id=OuterRef("pk"), group__name=GUARD_GROUP)
+        user = UserModel._default_manager.annotate(is_guard_member=Exists(guard)).filter(pk=user_id).first()
+        return user if user is not None and self.user_can_authenticate(user) else None
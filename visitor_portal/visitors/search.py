@@ -0,0 +1,191 @@
+import re
+from typing import Dict, Iterable, List, Tuple
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import FloatField, QuerySet, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Visit
+from .phones import digits_only
+
+
+FTS_TABLE = "visitors_visit_fts"
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def build_search_document(visit) -> str:
+    """Flatten the searchable fields of a visit into one string.
+
+    Phone numbers are also stored digits-only so fragments match regardless
+    of how the number was typed.
+    """
+    visitor = visit.visitor
+    employee = visit.employee
+    parts = [
+        visitor.full_name,
+        visitor.phone,
+        digits_only(visitor.phone),
+        employee.name,
+        employee.department,
+        visit.purpose,
+    ]
+    return " ".join(p.strip() for p in parts if p and p.strip())
+
+
+class BasicSearchBackend:
+    """Portable fallback: every query term must appear in the search document."""
+
+    name = "basic"
+
+    def filter(self, queryset: QuerySet, query: str) -> QuerySet:
+        """Restrict ``queryset`` to matching visits annotated with ``search_rank``."""
+        for term in query.split():
+            queryset = queryset.filter(search_document__icontains=term)
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    def index(self, visits: Iterable) -> None:
+        pass
+
+    def remove(self, visit_ids: Iterable[int]) -> None:
+        pass
+
+    def rebuild(self) -> int:
+        return 0
+
+
+class PostgresSearchBackend(BasicSearchBackend):
+    """Full-text search over a GIN-indexed ``tsvector`` of the search document.
+
+    Digit-only terms (phone fragments) use ``LIKE`` backed by a pg_trgm GIN
+    index instead, since tsvector only matches whole-word prefixes.
+    """
+
+    name = "postgres"
+
+    def filter(self, queryset: QuerySet, query: str) -> QuerySet:
+        from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+        words, digits = [], []
+        for term in _WORD_RE.findall(query.casefold()):
+            (digits if term.isdigit() else words).append(term)
+        for fragment in digits:
+            queryset = queryset.filter(search_document__contains=fragment)
+        if not words:
+            return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+        vector = SearchVector("search_document", config="simple")
+        search_query = SearchQuery(" & ".join(f"{w}:*" for w in words), config="simple", search_type="raw")
+        return queryset.annotate(search_vector=vector).filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(vector, search_query)
+        )
+
+
+class SQLiteFTSSearchBackend(BasicSearchBackend):
+    """SQLite FTS5 shadow table (trigram tokenizer) kept in sync by signals.
+
+    The trigram tokenizer gives substring matching like ``icontains`` but
+    through an index; terms shorter than three characters fall back to
+    ``LIKE`` on the search document.
+    """
+
+    name = "sqlite_fts"
+
+    def filter(self, queryset: QuerySet, query: str) -> QuerySet:
+        terms = query.split()
+        long_terms = [t for t in terms if len(t) >= 3]
+        if not long_terms:
+            return super().filter(queryset, query)
+        for term in terms:
+            if len(term) < 3:
+                queryset = queryset.filter(search_document__icontains=term)
+        match = " AND ".join('"{}"'.format(t.replace('"', '""')) for t in long_terms)
+        # bm25() is lower-is-better, so negate it for a descending rank
+        return queryset.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match])
+        ).annotate(search_rank=RawSQL(
+            f"SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+            f"AND {FTS_TABLE}.rowid = visitors_visit.id",
+            [match],
+            output_field=FloatField(),
+        ))
+
+    def index(self, visits: Iterable) -> None:
+        rows = [(v.id, v.search_document) for v in visits]
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"INSERT OR REPLACE INTO {FTS_TABLE}(rowid, search_document) VALUES (%s, %s)", rows)
+
+    def remove(self, visit_ids: Iterable[int]) -> None:
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [(pk,) for pk in visit_ids])
+
+    def rebuild(self) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}(rowid, search_document) SELECT id, search_document FROM visitors_visit"
+            )
+            return cursor.rowcount
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (BasicSearchBackend, PostgresSearchBackend, SQLiteFTSSearchBackend)
+}
+
+
+_resolved: Dict[Tuple[str, str], BasicSearchBackend] = {}
+
+
+def _backend_for(name: str, vendor: str) -> BasicSearchBackend:
+    """Resolve ``name`` for ``vendor``, remembering every answer but the fallback.
+
+    A missing FTS table is not cached, so a process that asked before
+    ``migrate`` created it picks up the index as soon as it exists.
+    """
+    backend = _resolved.get((name, vendor))
+    if backend is not None:
+        return backend
+    if name != "auto":
+        backend = BACKENDS[name]()
+    elif vendor == "postgresql":
+        backend = PostgresSearchBackend()
+    elif vendor == "sqlite" and FTS_TABLE in connection.introspection.table_names():
+        backend = SQLiteFTSSearchBackend()
+    else:
+        return BasicSearchBackend()
+    _resolved[(name, vendor)] = backend
+    return backend
+
+
+def get_search_backend() -> BasicSearchBackend:
+    """Return the configured visit search backend (VISIT_SEARCH_BACKEND)."""
+    return _backend_for(getattr(settings, "VISIT_SEARCH_BACKEND", "auto"), connection.vendor)
+
+
+def refresh_search_documents(queryset: QuerySet, batch_size: int = 1000) -> int:
+    """Recompute and store the search document for every visit in ``queryset``."""
+    backend = get_search_backend()
+    batch: List = []
+    updated = 0
+    for visit in queryset.select_related("visitor", "employee").iterator(chunk_size=batch_size):
+        document = build_search_document(visit)
+        if document == visit.search_document:
+            continue
+        visit.search_document = document
+        batch.append(visit)
+        if len(batch) >= batch_size:
+            updated += _flush(backend, batch)
+            batch = []
+    if batch:
+        updated += _flush(backend, batch)
+    return updated
+
+
+def _flush(backend: BasicSearchBackend, visits: List) -> int:
+    Visit.objects.bulk_update(visits, ["search_document"])
+    backend.index(visits)
+    return len(visits)
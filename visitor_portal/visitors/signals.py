@@ -0,0 +1,110 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .directory import invalidate_employee_directory
+from .models import Employee, Visitor, Visit
+from .images import IMAGE_FIELDS, encode_upload, schedule_thumbnail
+from .phones import normalize_phone
+from .stats import day_of, refresh_day
+from .search import build_search_document, get_search_backend, refresh_search_documents
+
+
+# Fields copied into Visit.search_document from related rows
+SEARCH_FIELDS = {
+    Employee: ("name", "department"),
+    Visitor: ("full_name", "phone"),
+}
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_delete, sender=Employee)
+def employee_changed(sender, **kwargs):
+    # Wait for commit so a concurrent rebuild cannot cache the pre-change rows
+    transaction.on_commit(invalidate_employee_directory)
+
+
+def _indexes_search(update_fields) -> bool:
+    return update_fields is None or "search_document" in update_fields
+
+
+@receiver(pre_save, sender=Visit)
+def visit_build_search_document(sender, instance, update_fields=None, **kwargs):
+    if _indexes_search(update_fields):
+        instance.search_document = build_search_document(instance)
+
+
+@receiver(post_save, sender=Visit)
+def visit_index_search_document(sender, instance, update_fields=None, **kwargs):
+    if _indexes_search(update_fields):
+        get_search_backend().index([instance])
+
+
+@receiver(post_delete, sender=Visit)
+def visit_remove_search_document(sender, instance, **kwargs):
+    get_search_backend().remove([instance.pk])
+
+
+@receiver(pre_save, sender=Visitor)
+def visitor_normalize_phone(sender, instance, update_fields=None, **kwargs):
+    # Legacy rows (not yet deduplicated) stay unkeyed so editing one cannot
+    # collide with the visitor it will be merged into, as do new visitors
+    # whose phone already belongs to someone with another email
+    if getattr(instance, "_unkeyed", False) or (instance.pk is not None and instance.phone_normalized is None):
+        return
+    # Saves limited to update_fields must list phone_normalized with phone
+    if update_fields is None or "phone" in update_fields:
+        instance.phone_normalized = normalize_phone(instance.phone)
+
+
+@receiver(pre_save, sender=Visitor)
+def visitor_encode_images(sender, instance, update_fields=None, **kwargs):
+    # New uploads are re-encoded before the file field writes them to storage
+    instance._new_images = []
+    for field in IMAGE_FIELDS:
+        upload = getattr(instance, field)
+        if not upload or upload._committed or (update_fields is not None and field not in update_fields):
+            continue
+        setattr(instance, field, encode_upload(upload.file, upload.name))
+        instance._new_images.append(field)
+
+
+@receiver(post_save, sender=Visitor)
+def visitor_schedule_thumbnails(sender, instance, **kwargs):
+    for field in getattr(instance, "_new_images", ()):
+        name = getattr(instance, field).name
+        transaction.on_commit(lambda name=name: schedule_thumbnail(name))
+
+
+@receiver(pre_save, sender=Employee)
+@receiver(pre_save, sender=Visitor)
+def related_detect_search_change(sender, instance, update_fields=None, **kwargs):
+    fields = SEARCH_FIELDS[sender]
+    instance._search_changed = False
+    if instance.pk is None or (update_fields is not None and not set(fields) & set(update_fields)):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    instance._search_changed = previous is not None and previous != tuple(getattr(instance, f) for f in fields)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=Visitor)
+def related_refresh_search_documents(sender, instance, created=False, **kwargs):
+    if not created and getattr(instance, "_search_changed", False):
+        lookup = "employee" if sender is Employee else "visitor"
+        refresh_search_documents(Visit.objects.filter(**{lookup: instance}))
+
+
+@receiver(post_save, sender=Visit)
+def visit_refresh_daily_stats(sender, instance, update_fields=None, **kwargs):
+    # Ending a visit (or editing an ended one) changes its day's rollup
+    if instance.ended_at and (update_fields is None or "ended_at" in update_fields):
+        transaction.on_commit(partial(refresh_day, day_of(instance.started_at)))
+
+
+@receiver(post_delete, sender=Visit)
+def visit_remove_from_daily_stats(sender, instance, **kwargs):
+    if instance.ended_at:
+        transaction.on_commit(partial(refresh_day, day_of(instance.started_at)))
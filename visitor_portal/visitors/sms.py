@@ -1,53 +1,141 @@
 import os
-import re
-from typing import Optional
-import json
-import urllib.request
-import urllib.error
-
-
-def _normalize_phone(raw: str, default_country: str = "IN") -> Optional[str]:
-    """Return E.164 phone or None if cannot normalize.
-
-    Current logic favors India (+91):
-    - Accepts +E164 as-is (digits only after '+').
-    - Strips spaces/dashes/parentheses.
-    - If starts with '0', trim leading zeros.
-    - If 10 digits, assume Indian local and prefix +91.
-    - If starts with 91 and total 12 digits, prefix '+'.
-    - Basic length guard: 10..15 digits after country code.
-    """
-    if not raw:
-        return None
-    s = str(raw).strip()
-    # Keep leading +, remove other non-digits
-    if s.startswith('+'):
-        digits = '+' + re.sub(r"\D", "", s[1:])
-        # Must be + followed by 10-15 digits
-        if re.fullmatch(r"\+[0-9]{10,15}", digits):
-            return digits
-        return None
+import threading
+import time
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import observe_provider
+from .phones import normalize_phone
+
+
+FAST2SMS_URL = "https://www.fast2sms.com/dev/bulkV2"
+FAST2SMS_TIMEOUT = float(os.getenv("FAST2SMS_TIMEOUT", "10"))
+# Numbers per bulkV2 request when the same text goes to many recipients
+FAST2SMS_BATCH_SIZE = int(os.getenv("FAST2SMS_BATCH_SIZE", "100"))
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class BatchResult(NamedTuple):
+    channel: str
+    numbers: List[str]  # provider-format numbers included in the request
+    request_id: Optional[str]
+    error: str
+    latency: float  # seconds spent on the HTTP request
+
+    @property
+    def ok(self) -> bool:
+        return self.request_id is not None
+
+
+def _get_session() -> requests.Session:
+    """Shared HTTP session so Fast2SMS requests reuse kept-alive connections."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=int(os.getenv("FAST2SMS_POOL_SIZE", "4")),
+                )
+                session.mount("https://", adapter)
+                _session = session
+    return _session
+
+
+def _credentials(channel: str) -> Optional[Tuple[str, dict]]:
+    """Return (api key, route-specific payload fields) or None if not configured."""
+    if channel == "whatsapp":
+        api_key = os.getenv("WHATSAPP_API_KEY")
+        instance_id = os.getenv("WHATSAPP_INSTANCE_ID")
+        token = os.getenv("WHATSAPP_TOKEN")
+        if not api_key or not instance_id or not token:
+            return None
+        return api_key, {"route": "whatsapp", "sender_id": "WHATSAPP", "instance_id": instance_id, "token": token}
 
-    # Remove all non-digits
-    digits_only = re.sub(r"\D", "", s)
-    if not digits_only:
+    api_key = os.getenv("FAST2SMS_API_KEY")
+    if not api_key:
         return None
+    return api_key, {"route": "v3", "sender_id": os.getenv("FAST2SMS_SENDER_ID", "TXTIND")}
+
+
+def provider_number(channel: str, phone: str) -> Optional[str]:
+    """Format a phone number the way Fast2SMS expects it, or None if invalid.
+
+    SMS takes Indian numbers without the country code; WhatsApp and other
+    countries take the E.164 digits without the '+'.
+    """
+    normalized = normalize_phone(phone) or ""
+    if channel == "sms" and normalized.startswith('+91'):
+        number = normalized[3:]
+    elif normalized.startswith('+'):
+        number = normalized[1:]
+    else:
+        number = normalized
+    return number if number.isdigit() else None
+
 
-    # Trim leading zeros
-    digits_only = digits_only.lstrip('0') or '0'
+def _post(api_key: str, payload: dict) -> Tuple[Optional[str], str]:
+    """POST one bulkV2 request; returns (request id, "") or (None, error)."""
+    try:
+        with observe_provider("fast2sms"):
+            resp = _get_session().post(
+                FAST2SMS_URL,
+                json=payload,
+                headers={"authorization": api_key},
+                timeout=FAST2SMS_TIMEOUT,
+            )
+        obj = resp.json()
+    except (requests.RequestException, ValueError) as e:
+        return None, str(e)
+    if isinstance(obj, dict) and obj.get('return') is True:
+        return str(obj.get('request_id') or obj.get('message') or 'ok'), ""
+    message = obj.get('message') if isinstance(obj, dict) else None
+    return None, str(message or f"HTTP {resp.status_code}")
+
+
+def send_bulk(channel: str, phones: Iterable[str], message: str, batch_size: Optional[int] = None) -> List[BatchResult]:
+    """Send the same text to many numbers with as few requests as possible.
+
+    bulkV2 accepts a comma-separated ``numbers`` list, so recipients are
+    deduplicated and sent ``batch_size`` at a time. Invalid numbers are
+    dropped; callers can check them with ``provider_number``.
+    """
+    return send_numbers(channel, (provider_number(channel, p) for p in phones), message, batch_size)
 
-    # India heuristics
-    if default_country.upper() == 'IN':
-        if len(digits_only) == 10:
-            return "+91" + digits_only
-        if digits_only.startswith('91') and len(digits_only) == 12:
-            return "+" + digits_only
 
-    # Fallback: if looks like countrycode+number in 10..15 digits, prefix '+'
-    if 10 <= len(digits_only) <= 15:
-        return "+" + digits_only
+def send_numbers(channel: str, numbers: Iterable[Optional[str]], message: str,
+                 batch_size: Optional[int] = None) -> List[BatchResult]:
+    """``send_bulk`` for numbers already in ``provider_number`` format.
 
-    return None
+    They are sent as given: formatting them again would strip a leading
+    91 or 0 that belongs to the national number.
+    """
+    numbers = list(dict.fromkeys(n for n in numbers if n))
+    if not numbers:
+        return []
+    credentials = _credentials(channel)
+    if credentials is None:
+        return [BatchResult(channel, numbers, None, f"{channel} provider not configured", 0.0)]
+
+    api_key, route = credentials
+    size = batch_size or FAST2SMS_BATCH_SIZE
+    results = []
+    for start in range(0, len(numbers), size):
+        chunk = numbers[start:start + size]
+        payload = {**route, "message": message, "language": "english", "flash": 0, "numbers": ",".join(chunk)}
+        started = time.perf_counter()
+        request_id, error = _post(api_key, payload)
+        result = BatchResult(channel, chunk, request_id, error, time.perf_counter() - started)
+        if len(chunk) > 1 or not result.ok:
+            status = f"ok ({request_id})" if result.ok else f"FAILED: {error}"
+            print(f"{'✅' if result.ok else '❌'} {channel} batch of {len(chunk)} in {result.latency * 1000:.0f}ms {status}")
+        results.append(result)
+    return results
 
 
 def send_sms(to_phone: str, message: str) -> Optional[str]:
@@ -55,54 +143,8 @@ def send_sms(to_phone: str, message: str) -> Optional[str]:
 
     Returns provider message id or None.
     """
-    api_key = os.getenv("FAST2SMS_API_KEY")
-    if not api_key:
-        return None
-
-    # Normalize to E.164; Fast2SMS expects numbers without '+' for India
-    normalized = _normalize_phone(to_phone) or ""
-    if normalized.startswith('+91'):
-        recipients = normalized.replace('+91', '', 1)
-    elif normalized.startswith('+'):
-        # Non-India: attempt to strip leading '+' only
-        recipients = normalized[1:]
-    else:
-        recipients = normalized
-    if not recipients or not recipients.isdigit():
-        return None
-
-    payload = {
-        "route": "v3",
-        "sender_id": os.getenv("FAST2SMS_SENDER_ID", "TXTIND"),
-        "message": message,
-        "language": "english",
-        "flash": 0,
-        "numbers": recipients,
-    }
-    data = json.dumps(payload).encode('utf-8')
-    req = urllib.request.Request(
-        url="https://www.fast2sms.com/dev/bulkV2",
-        data=data,
-        headers={
-            "authorization": api_key,
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
-    try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            resp_data = resp.read()
-            try:
-                obj = json.loads(resp_data.decode('utf-8'))
-                if obj.get('return') is True:
-                    return str(obj.get('request_id') or obj.get('message') or 'ok')
-            except Exception:
-                pass
-            return None
-    except urllib.error.HTTPError:
-        return None
-    except urllib.error.URLError:
-        return None
+    results = send_bulk("sms", [to_phone], message)
+    return results[0].request_id if results else None
 
 
 def send_whatsapp(to_phone: str, message: str) -> Optional[str]:
@@ -110,57 +152,8 @@ def send_whatsapp(to_phone: str, message: str) -> Optional[str]:
 
     Returns provider message id or None.
     """
-    api_key = os.getenv("WHATSAPP_API_KEY")
-    instance_id = os.getenv("WHATSAPP_INSTANCE_ID")
-    token = os.getenv("WHATSAPP_TOKEN")
-    
-    if not api_key or not instance_id or not token:
-        return None
-
-    # Normalize to E.164 format for WhatsApp
-    normalized = _normalize_phone(to_phone)
-    if not normalized:
-        return None
-
-    # Remove the '+' prefix for Fast2SMS WhatsApp API
-    recipients = normalized[1:] if normalized.startswith('+') else normalized
-    
-    payload = {
-        "route": "whatsapp",
-        "sender_id": "WHATSAPP",
-        "message": message,
-        "language": "english",
-        "flash": 0,
-        "numbers": recipients,
-        "instance_id": instance_id,
-        "token": token,
-    }
-    
-    data = json.dumps(payload).encode('utf-8')
-    req = urllib.request.Request(
-        url="https://www.fast2sms.com/dev/bulkV2",
-        data=data,
-        headers={
-            "authorization": api_key,
-            "Content-Type": "application/json",
-        },
-        method="POST",
-    )
-    
-    try:
-        with urllib.request.urlopen(req, timeout=10) as resp:
-            resp_data = resp.read()
-            try:
-                obj = json.loads(resp_data.decode('utf-8'))
-                if obj.get('return') is True:
-                    return str(obj.get('request_id') or obj.get('message') or 'ok')
-            except Exception:
-                pass
-            return None
-    except urllib.error.HTTPError:
-        return None
-    except urllib.error.URLError:
-        return None
+    results = send_bulk("whatsapp", [to_phone], message)
+    return results[0].request_id if results else None
 
 
 def send_message(to_phone: str, message: str, message_type: str = "sms") -> Optional[str]:
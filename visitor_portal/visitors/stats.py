@@ -0,0 +1,135 @@
+import math
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from django.db import IntegrityError, transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import DailyVisitStats, Visit
+
+
+# (employee id, department, started_at, ended_at) of one ended visit
+VisitRow = Tuple[int, str, datetime, datetime]
+
+
+class BackfillResult(NamedTuple):
+    days: int
+    rows: int
+    visits: int
+
+
+def day_of(moment: datetime) -> date:
+    return timezone.localdate(moment)
+
+
+def _day_start(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, dt_time.min))
+
+
+def p95(durations: List[int]) -> int:
+    """Nearest-rank 95th percentile of sorted ``durations``."""
+    if not durations:
+        return 0
+    return durations[max(0, math.ceil(0.95 * len(durations)) - 1)]
+
+
+def peak_concurrent(intervals: Iterable[Tuple[datetime, datetime]]) -> int:
+    """Most visits in progress at the same moment."""
+    # At equal times the end (-1) sorts first: back-to-back visits do not overlap
+    events = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    peak = current = 0
+    for _, change in events:
+        current += change
+        peak = max(peak, current)
+    return peak
+
+
+def _summarize(day: date, employee_id: Optional[int], department: str, visits: List[VisitRow]) -> DailyVisitStats:
+    durations = sorted(max(0, int((ended - started).total_seconds())) for _, _, started, ended in visits)
+    return DailyVisitStats(
+        day=day,
+        employee_id=employee_id,
+        department=department,
+        visits=len(visits),
+        total_duration_seconds=sum(durations),
+        p95_duration_seconds=p95(durations),
+        peak_concurrent=peak_concurrent([(started, ended) for _, _, started, ended in visits]),
+    )
+
+
+def build_rows(day: date, visits: List[VisitRow]) -> List[DailyVisitStats]:
+    """The rollup rows for one day: per employee, then the site-wide total."""
+    by_employee: Dict[int, List[VisitRow]] = {}
+    for visit in visits:
+        by_employee.setdefault(visit[0], []).append(visit)
+    rows = [_summarize(day, employee_id, group[0][1] or "", group) for employee_id, group in by_employee.items()]
+    if visits:
+        rows.append(_summarize(day, None, "", visits))
+    return rows
+
+
+def _ended_visits(start: datetime, end: datetime):
+    return (
+        Visit.objects.filter(started_at__gte=start, started_at__lt=end, ended_at__isnull=False)
+        .values_list("employee_id", "employee__department", "started_at", "ended_at")
+    )
+
+
+def _replace_day(day: date, rows: List[DailyVisitStats]) -> None:
+    with transaction.atomic():
+        DailyVisitStats.objects.filter(day=day).delete()
+        DailyVisitStats.objects.bulk_create(rows)
+
+
+def refresh_day(day: date) -> int:
+    """Recompute the rollup rows of ``day`` from its ended visits.
+
+    A day holds at most a few hundred visits, so recomputing it is one
+    indexed range query and a small rewrite. Returns the rows written.
+    """
+    start = _day_start(day)
+    for attempt in range(2):
+        rows = build_rows(day, list(_ended_visits(start, _day_start(day + timedelta(days=1)))))
+        try:
+            _replace_day(day, rows)
+            return len(rows)
+        except IntegrityError:
+            # A concurrent refresh of the same day committed first; its
+            # write is visible now, so recompute on top of it
+            if attempt:
+                raise
+    return 0
+
+
+def backfill(since: Optional[date] = None, until: Optional[date] = None, window_days: int = 31) -> BackfillResult:
+    """Rebuild the rollups for every day from ``since`` to ``until`` inclusive.
+
+    Visits are read ``window_days`` at a time in start order and written
+    one day per transaction; days in the range without ended visits lose
+    their rows.
+    """
+    until = until or timezone.localdate()
+    if since is None:
+        first = Visit.objects.filter(ended_at__isnull=False).aggregate(first=Min("started_at"))["first"]
+        if first is None:
+            DailyVisitStats.objects.filter(day__lte=until).delete()
+            return BackfillResult(0, 0, 0)
+        since = day_of(first)
+
+    days = rows = count = 0
+    window_start = since
+    while window_start <= until:
+        window_end = min(window_start + timedelta(days=window_days), until + timedelta(days=1))
+        by_day: Dict[date, List[VisitRow]] = {}
+        for visit in _ended_visits(_day_start(window_start), _day_start(window_end)).order_by("started_at"):
+            by_day.setdefault(day_of(visit[2]), []).append(visit)
+        for day, visits in by_day.items():
+            day_rows = build_rows(day, visits)
+            _replace_day(day, day_rows)
+            days += 1
+            rows += len(day_rows)
+            count += len(visits)
+        DailyVisitStats.objects.filter(day__gte=window_start, day__lt=window_end).exclude(day__in=list(by_day)).delete()
+        window_start = window_end
+    return BackfillResult(days, rows, count)
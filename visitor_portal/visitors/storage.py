@@ -0,0 +1,264 @@
+import hashlib
+import hmac
+import os
+import re
+import tempfile
+import threading
+from datetime import datetime, timezone as dt_timezone
+from typing import Iterable, Optional, Tuple
+from urllib.parse import quote
+
+import requests
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, Storage
+from django.utils.deconstruct import deconstructible
+from requests.adapters import HTTPAdapter
+
+from .metrics import observe_provider
+
+
+# Upload directories whose files are stored under their SHA-256
+HASHED_DIRS = ("visitor_photos", "visitor_ids")
+HASHED_NAME_RE = re.compile(r"^(?P<dir>[\w-]+)/(?P<a>[0-9a-f]{2})/(?P<b>[0-9a-f]{2})/(?P<digest>[0-9a-f]{64})(?P<ext>\.\w+)?$")
+
+
+def is_hashed_name(name: str) -> bool:
+    match = HASHED_NAME_RE.match(name or "")
+    return bool(match) and match["digest"][:4] == match["a"] + match["b"]
+
+
+class ContentAddressedMixin:
+    """Store files under ``<dir>/<aa>/<bb>/<sha256><ext>``.
+
+    Saving identical bytes twice (the same ID scan uploaded by a returning
+    visitor) stores them once and returns the same name, and a name never
+    changes content, so anything derived from it can be cached forever.
+    Files are shared between rows and so are never deleted by the app.
+    Names outside ``hashed_dirs`` (e.g. thumbnails) are stored as given.
+    """
+
+    def __init__(self, *args, hashed_dirs: Iterable[str] = HASHED_DIRS, **kwargs):
+        self.hashed_dirs = tuple(hashed_dirs)
+        super().__init__(*args, **kwargs)
+
+    def is_hashed_dir(self, name: str) -> bool:
+        return name.replace("\\", "/").split("/", 1)[0] in self.hashed_dirs
+
+    @staticmethod
+    def hashed_name(name: str, digest: str) -> str:
+        directory = name.replace("\\", "/").split("/", 1)[0]
+        ext = os.path.splitext(name)[1].lower()
+        return f"{directory}/{digest[:2]}/{digest[2:4]}/{digest}{ext}"
+
+    @staticmethod
+    def digest(content) -> str:
+        sha = hashlib.sha256()
+        for chunk in content.chunks():
+            sha.update(chunk)
+        return sha.hexdigest()
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not self.is_hashed_dir(name):
+            return super().save(name, content, max_length=max_length)
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        digest = self.digest(content)
+        key = self.hashed_name(name, digest)
+        if not self.exists(key):
+            self._save_blob(key, content, digest)
+        return key
+
+    def _save_blob(self, key: str, content, digest: str) -> None:
+        raise NotImplementedError
+
+
+@deconstructible(path="visitors.storage.ContentAddressedFileSystemStorage")
+class ContentAddressedFileSystemStorage(ContentAddressedMixin, FileSystemStorage):
+    """Content-addressed storage on local disk (MEDIA_ROOT by default)."""
+
+    def _save_blob(self, key, content, digest):
+        full_path = self.path(key)
+        directory = os.path.dirname(full_path)
+        os.makedirs(directory, exist_ok=True)
+        # Write aside and rename: a concurrent save of the same bytes just
+        # replaces the file with an identical one
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in content.chunks():
+                    f.write(chunk)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            os.replace(temp_path, full_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+class S3Error(RuntimeError):
+    pass
+
+
+@deconstructible(path="visitors.storage.S3Storage")
+class S3Storage(Storage):
+    """Minimal S3-compatible object storage (AWS S3, Cloudflare R2, MinIO).
+
+    Requests are signed with AWS Signature V4 and sent path-style
+    (``<endpoint>/<bucket>/<key>``) over a pooled ``requests`` session, so
+    no SDK is needed. ``url()`` returns ``public_url/<key>`` when the
+    bucket is public, otherwise a presigned GET valid for ``url_expiry``
+    seconds.
+    """
+
+    def __init__(self, endpoint_url: str = "", bucket: str = "", access_key_id: str = "",
+                 secret_access_key: str = "", region: str = "us-east-1", public_url: str = "",
+                 url_expiry: int = 3600, timeout: float = 10, pool_size: int = 4):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.bucket = bucket
+        self.access_key_id = access_key_id
+        self.secret_access_key = secret_access_key
+        self.region = region
+        self.public_url = public_url.rstrip("/")
+        self.url_expiry = url_expiry
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+
+    def _get_session(self) -> requests.Session:
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    if not (self.endpoint_url and self.bucket and self.access_key_id and self.secret_access_key):
+                        raise ImproperlyConfigured("S3 storage needs endpoint_url, bucket and credentials")
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    # --- Signature V4 ---------------------------------------------------
+
+    def _path(self, name: str) -> str:
+        return quote(f"/{self.bucket}/{name}", safe="/-_.~")
+
+    def _host(self) -> str:
+        return self.endpoint_url.split("://", 1)[-1]
+
+    def _scope(self, now: datetime) -> Tuple[str, str]:
+        date = now.strftime("%Y%m%d")
+        return date, f"{date}/{self.region}/s3/aws4_request"
+
+    def _signature(self, date: str, string_to_sign: str) -> str:
+        key = f"AWS4{self.secret_access_key}".encode()
+        for part in (date, self.region, "s3", "aws4_request"):
+            key = hmac.new(key, part.encode(), hashlib.sha256).digest()
+        return hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    def _string_to_sign(self, method, path, query, headers, payload_hash, amz_date, scope) -> Tuple[str, str]:
+        signed = ";".join(sorted(headers))
+        canonical = "\n".join([
+            method, path, query,
+            "".join(f"{k}:{headers[k].strip()}\n" for k in sorted(headers)),
+            signed, payload_hash,
+        ])
+        digest = hashlib.sha256(canonical.encode()).hexdigest()
+        return signed, f"AWS4-HMAC-SHA256\n{amz_date}\n{scope}\n{digest}"
+
+    def _request(self, method: str, name: str, body: bytes = b"", payload_hash: str = "") -> requests.Response:
+        now = datetime.now(dt_timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date, scope = self._scope(now)
+        path = self._path(name)
+        signed_headers = {
+            "host": self._host(),
+            "x-amz-content-sha256": payload_hash or hashlib.sha256(body).hexdigest(),
+            "x-amz-date": amz_date,
+        }
+        signed, string_to_sign = self._string_to_sign(
+            method, path, "", signed_headers, signed_headers["x-amz-content-sha256"], amz_date, scope,
+        )
+        signed_headers["authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key_id}/{scope}, "
+            f"SignedHeaders={signed}, Signature={self._signature(date, string_to_sign)}"
+        )
+        signed_headers.pop("host")  # requests sets it from the URL
+        with observe_provider("s3"):
+            response = self._get_session().request(
+                method, f"{self.endpoint_url}{path}", data=body or None, headers=signed_headers, timeout=self.timeout,
+            )
+        if response.status_code >= 400 and not (method in ("HEAD", "GET") and response.status_code == 404):
+            raise S3Error(f"S3 {method} {name} failed: HTTP {response.status_code} {response.text[:200]}")
+        return response
+
+    def presigned_url(self, name: str, expires: Optional[int] = None) -> str:
+        now = datetime.now(dt_timezone.utc)
+        amz_date = now.strftime("%Y%m%dT%H%M%SZ")
+        date, scope = self._scope(now)
+        params = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Credential": f"{self.access_key_id}/{scope}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires or self.url_expiry),
+            "X-Amz-SignedHeaders": "host",
+        }
+        query = "&".join(f"{quote(k, safe='-_.~')}={quote(v, safe='-_.~')}" for k, v in sorted(params.items()))
+        path = self._path(name)
+        _, string_to_sign = self._string_to_sign(
+            "GET", path, query, {"host": self._host()}, "UNSIGNED-PAYLOAD", amz_date, scope,
+        )
+        return f"{self.endpoint_url}{path}?{query}&X-Amz-Signature={self._signature(date, string_to_sign)}"
+
+    # --- Storage API ----------------------------------------------------
+
+    def _open(self, name, mode="rb"):
+        response = self._request("GET", name)
+        if response.status_code == 404:
+            raise FileNotFoundError(name)
+        return ContentFile(response.content, name=name)
+
+    def _save(self, name, content):
+        content.seek(0)
+        self._put(name, content.read())
+        return name
+
+    def _put(self, name: str, body: bytes, digest: str = "") -> None:
+        self._request("PUT", name, body=body, payload_hash=digest)
+
+    def delete(self, name):
+        self._request("DELETE", name)
+
+    def exists(self, name):
+        return self._request("HEAD", name).status_code == 200
+
+    def size(self, name):
+        response = self._request("HEAD", name)
+        if response.status_code == 404:
+            raise FileNotFoundError(name)
+        return int(response.headers.get("Content-Length", 0))
+
+    def url(self, name):
+        if self.public_url:
+            return f"{self.public_url}/{quote(name, safe='/-_.~')}"
+        return self.presigned_url(name)
+
+    def get_available_name(self, name, max_length=None):
+        # Thumbnails and other named files are overwritten in place
+        return name
+
+
+@deconstructible(path="visitors.storage.ContentAddressedS3Storage")
+class ContentAddressedS3Storage(ContentAddressedMixin, S3Storage):
+    """Content-addressed storage in an S3-compatible bucket."""
+
+    def _save_blob(self, key, content, digest):
+        body = b"".join(content.chunks())
+        # The content digest is also the payload hash the signature needs
+        self._put(key, body, digest)
+
@@ -1,14 +1,21 @@
 from django.urls import path
-from .views import IntakeView, visit_detail, end_visit, dashboard, guard_visit_detail, health_check
+from .views import IntakeView, employee_search, visit_detail, end_visit, dashboard, dashboard_events, guard_visit_detail, visitor_thumbnail, export_data, health_check, metrics, visit_report, long_visits
 
 
 urlpatterns = [
     path("", IntakeView.as_view(), name="intake"),
+    path("employees/search/", employee_search, name="employee_search"),
     path("visit/<int:visit_id>/", visit_detail, name="visit_detail"),
     path("visit/<int:visit_id>/end/", end_visit, name="end_visit"),
     # Custom admin-like dashboard path not visible from public pages
     path("control/", dashboard, name="dashboard"),
+    path("control/events/", dashboard_events, name="dashboard_events"),
     path("control/visit/<int:visit_id>/", guard_visit_detail, name="guard_visit_detail"),
+    path("control/thumbs/<path:name>", visitor_thumbnail, name="visitor_thumbnail"),
+    path("control/export/<str:kind>/", export_data, name="export_data"),
+    path("control/metrics/", metrics, name="metrics"),
+    path("control/reports/", visit_report, name="visit_report"),
+    path("control/long-visits/", long_visits, name="long_visits"),
     # Health check endpoint for keeping service warm
     path("health/", health_check, name="health_check"),
 ]
@@ -1,17 +1,38 @@
+import hmac
+from datetime import timedelta
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
 from django.views import View
+from django.conf import settings
 from django.contrib.auth.decorators import login_required, user_passes_test
+from django.contrib.auth.views import redirect_to_login
 from django import forms
-from django.http import JsonResponse
-
-from .models import Employee, Visitor, Visit
+from django.db.models import Count, Max, Q, Sum
+from django.db.models.functions import Coalesce
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+
+from .directory import get_employee_directory, get_employee_index
+from .durations import longer_than, with_elapsed
+from .exports import EXPORTS, FORMATS, export_stream, parse_day
+from .images import CONTENT_TYPES, is_thumbnail_source, make_thumbnail, thumbnail_name
+from .identity import find_returning_visitor, save_visitor
+from .events import broker, event_stream, event_stream_async, poll_events, publish_visit_event
+from .metrics import registry
+from .models import DailyVisitStats, Employee, Visitor, Visit
+from .otp import RateLimited, client_ip, issue_code, verify_code
+from .pagination import keyset_paginate
+from .roles import is_guard
+from .search import get_search_backend
 from .email import send_otp_email, send_visitor_notification_email
 
 
 class VisitorForm(forms.ModelForm):
     employee_name = forms.CharField(max_length=200, required=True, label="Whom to meet")
+    employee_id = forms.IntegerField(required=False, widget=forms.HiddenInput)
     purpose = forms.CharField(max_length=255, required=True, label="Purpose of meeting")
     otp = forms.CharField(max_length=6, required=False, label="OTP (sent to email)")
 
@@ -37,6 +58,21 @@ class VisitorForm(forms.ModelForm):
         }
 
 
+def _intake_context(**context):
+    """Build the intake template context.
+
+    Only the employee directory version is embedded; it keys the browser's
+    cache of ``employee_search`` results.
+    """
+    context["employee_directory_version"] = get_employee_directory().version
+    return context
+
+
+def _rate_limited_message(error: RateLimited) -> str:
+    minutes = max(1, -(-error.retry_after // 60))
+    return f"Too many attempts. Try again in {minutes} minute{'s' if minutes > 1 else ''}."
+
+
 class IntakeView(View):
     def get(self, request):
         form = VisitorForm()
@@ -44,15 +80,60 @@ class IntakeView(View):
         visit_id = request.session.get("active_visit_id")
         if visit_id:
             try:
-                candidate = Visit.objects.get(id=visit_id)
+                candidate = Visit.objects.select_related("employee").get(id=visit_id)
                 if candidate.ended_at is None:
                     active_visit = candidate
             except Visit.DoesNotExist:
                 request.session.pop("active_visit_id", None)
-        employees = list(Employee.objects.filter(active=True).values("id", "name", "department"))
-        return render(request, "visitors/intake.html", {"form": form, "active_visit": active_visit, "employees": employees})
+        return render(request, "visitors/intake.html", _intake_context(form=form, active_visit=active_visit))
+
+    def _otp_action(self, request):
+        ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
+        form = VisitorForm(request.POST)
+        email = (request.POST.get("email") or "").strip()
+        ip = client_ip(request)
+
+        def fail(message, status=400, field="email"):
+            if ajax:
+                return JsonResponse({"ok": False, "error": message}, status=status)
+            form.add_error(field, message)
+            return render(request, "visitors/intake.html", _intake_context(form=form), status=status)
+
+        # Sending only needs an email, not a valid form
+        if request.POST.get("action") == "send_otp":
+            if not email:
+                return fail("Enter an email address first")
+            try:
+                code = issue_code(email, ip)
+            except RateLimited as e:
+                return fail(_rate_limited_message(e), status=429)
+            if not send_otp_email(email, code):
+                return fail("Could not send OTP. Check email address and try again.")
+            if ajax:
+                return JsonResponse({"ok": True, "otp_sent": True})
+            return render(request, "visitors/intake.html", _intake_context(form=form, otp_sent=True))
+
+        # Once the OTP proves the email, hand back what we know about a
+        # returning visitor so the page can prefill the form. The code is
+        # not consumed; the final submit still needs it
+        try:
+            valid = verify_code(email, request.POST.get("otp"), ip)
+        except RateLimited as e:
+            return fail(_rate_limited_message(e), status=429, field="otp")
+        if not valid:
+            return fail("Invalid or expired OTP", field="otp")
+        returning = find_returning_visitor(email=email)
+        details = None
+        if returning is not None:
+            details = {"full_name": returning.full_name, "phone": returning.phone, "address": returning.address}
+        return JsonResponse({"ok": True, "visitor": details})
 
     def post(self, request):
+        # OTP actions come first: they use the cache only, so sending and
+        # checking a code never touches the session or the database
+        if request.POST.get("action") in ("send_otp", "verify_otp"):
+            return self._otp_action(request)
+
         # If there is an ongoing visit in this session, redirect to it
         visit_id = request.session.get("active_visit_id")
         if visit_id:
@@ -64,90 +145,45 @@ class IntakeView(View):
                 request.session.pop("active_visit_id", None)
 
         form = VisitorForm(request.POST)
-
-        # If the user clicked Send OTP, we only need a syntactically valid email
-        if request.POST.get("action") == "send_otp":
-            email_input = (request.POST.get("email") or "").strip()
-            employees = list(Employee.objects.filter(active=True).values("id", "name", "department"))
-            if not email_input:
-                if request.headers.get("x-requested-with") == "XMLHttpRequest":
-                    return JsonResponse({"ok": False, "error": "Enter an email address first"}, status=400)
-                form.add_error("email", "Enter an email address first")
-                return render(request, "visitors/intake.html", {"form": form, "employees": employees})
-
-            # Generate and send OTP without validating full form yet
-            now_ts = int(timezone.now().timestamp())
-            import random
-            code = str(random.randint(100000, 999999))
-            expires_ts = now_ts + 300
-            request.session["otp_data"] = {"email": email_input, "code": code, "expires_ts": expires_ts}
-            request.session.modified = True
-            result = send_otp_email(email_input, code)
-            if request.headers.get("x-requested-with") == "XMLHttpRequest":
-                if result:
-                    return JsonResponse({"ok": True, "otp_sent": True})
-                return JsonResponse({"ok": False, "error": "Could not send OTP. Check email address and try again."}, status=400)
-            context = {"form": form, "employees": employees}
-            if result:
-                context["otp_sent"] = True
-            else:
-                form.add_error("email", "Could not send OTP. Check email address and try again.")
-            return render(request, "visitors/intake.html", context)
-
         if not form.is_valid():
-            employees = list(Employee.objects.filter(active=True).values("id", "name", "department"))
-            return render(request, "visitors/intake.html", {"form": form, "employees": employees})
+            return render(request, "visitors/intake.html", _intake_context(form=form))
 
         email = form.cleaned_data["email"].strip()
         provided_otp = (form.cleaned_data.get("otp") or "").strip()
+        ip = client_ip(request)
 
-        # Session-based OTP store
-        otp_data = request.session.get("otp_data") or {}
-        now_ts = int(timezone.now().timestamp())
-
-        def _generate_code() -> str:
-            import random
-            return str(random.randint(100000, 999999))
-
-        # Validate OTP; if missing or mismatched, send or resend
-        otp_valid = False
-        if otp_data and otp_data.get("email") == email and otp_data.get("code") == provided_otp:
-            # Check expiry (5 minutes)
-            if now_ts <= int(otp_data.get("expires_ts", 0)):
-                otp_valid = True
-
-        if not otp_valid:
-            # Create new code if none exists for this email or expired/mismatch
-            code = _generate_code()
-            expires_ts = now_ts + 300  # 5 minutes
-            request.session["otp_data"] = {"email": email, "code": code, "expires_ts": expires_ts}
-            request.session.modified = True
-
-            # Send OTP via Email
-            result = send_otp_email(email, code)
-
-            # Ask user to input the code
-            if not result:
-                form.add_error("email", "Could not send OTP. Check email address and try again.")
-                employees = list(Employee.objects.filter(active=True).values("id", "name", "department"))
-                return render(request, "visitors/intake.html", {"form": form, "employees": employees})
-            form.add_error("otp", "Enter the OTP sent to your email")
-            employees = list(Employee.objects.filter(active=True).values("id", "name", "department"))
-            return render(request, "visitors/intake.html", {"form": form, "otp_sent": True, "employees": employees})
+        try:
+            otp_valid = verify_code(email, provided_otp, ip, consume=True)
+            if not otp_valid:
+                # Missing, wrong or expired: send a fresh code and ask for it
+                result = send_otp_email(email, issue_code(email, ip))
+                if not result:
+                    form.add_error("email", "Could not send OTP. Check email address and try again.")
+                    return render(request, "visitors/intake.html", _intake_context(form=form))
+                form.add_error("otp", "Enter the OTP sent to your email")
+                return render(request, "visitors/intake.html", _intake_context(form=form, otp_sent=True))
+        except RateLimited as e:
+            form.add_error("otp", _rate_limited_message(e))
+            return render(request, "visitors/intake.html", _intake_context(form=form), status=429)
 
         # OTP valid; proceed to create records
-        # Resolve employee from the single free-text field with suggestions
+        # Resolve employee by the id picked from the suggestions; typed names
+        # go through the in-memory index instead of a LIKE scan
+        emp_id = form.cleaned_data.get("employee_id")
         emp_name = (form.cleaned_data.get("employee_name") or request.POST.get("employee_name") or "").strip()
         employee = None
-        if emp_name:
-            employee = Employee.objects.filter(active=True, name__iexact=emp_name).first() or \
-                       Employee.objects.filter(active=True, name__icontains=emp_name).first()
+        if emp_id:
+            employee = Employee.objects.filter(active=True, pk=emp_id).first()
+        elif emp_name:
+            match = get_employee_index().resolve(emp_name)
+            if match is not None:
+                employee = Employee.objects.filter(active=True, pk=match["id"]).first()
         if employee is None:
             form.add_error("employee_name", "Please choose a valid employee")
-            employees = list(Employee.objects.filter(active=True).values("id", "name", "department"))
-            return render(request, "visitors/intake.html", {"form": form, "employees": employees})
+            return render(request, "visitors/intake.html", _intake_context(form=form))
 
-        visitor = form.save()
+        # Repeat visitors reuse their record instead of adding a new row
+        visitor = save_visitor(form.cleaned_data)
 
         visit = Visit.objects.create(
             visitor=visitor,
@@ -157,66 +193,82 @@ class IntakeView(View):
             started_at=timezone.now(),
         )
 
-        # Clear OTP data
-        try:
-            request.session.pop("otp_data", None)
-        except Exception:
-            pass
-
         # Track the active visit in the user's session
         request.session["active_visit_id"] = visit.id
 
-        # Notify employee with visitor name and phone via email
+        # Notify employee with visitor name and phone via email; the outbox
+        # sets sms_sent_at once the provider accepts it
         purpose_text = form.cleaned_data.get("purpose", "visit") or "visit"
-        result = send_visitor_notification_email(
+        send_visitor_notification_email(
             to_email=employee.email,
             visitor_name=visitor.full_name,
             visitor_phone=visitor.phone,
-            purpose=purpose_text
+            purpose=purpose_text,
+            visit=visit,
         )
-        if result is not None:
-            visit.sms_sent_at = timezone.now()
-        visit.save(update_fields=["sms_sent_at"])
+        publish_visit_event("created", visit)
 
         return redirect(reverse("visit_detail", args=[visit.id]))
 
 
+def employee_search(request):
+    """Typeahead lookup for the intake "Whom to meet" field.
+
+    Query params: ``q`` (free text, empty lists employees alphabetically),
+    ``limit`` (default 10, max 50) and optional ``v`` (directory version).
+    """
+    try:
+        limit = min(max(int(request.GET.get("limit", 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    index = get_employee_index()
+    results = index.search(request.GET.get("q", ""), limit=limit)
+    response = JsonResponse({"version": index.version, "results": results})
+    if request.GET.get("v") == index.version:
+        response["Cache-Control"] = "private, max-age=3600"
+    return response
+
+
 def visit_detail(request, visit_id: int):
-    visit = get_object_or_404(Visit, id=visit_id)
-    if visit.ended_at is None:
+    visit = get_object_or_404(Visit.objects.select_related("visitor", "employee"), id=visit_id)
+    # Only write the session when it changes; every save is a DB round trip
+    if visit.ended_at is None and request.session.get("active_visit_id") != visit.id:
         request.session["active_visit_id"] = visit.id
     return render(request, "visitors/visit_detail.html", {"visit": visit})
 
 
 def end_visit(request, visit_id: int):
-    visit = get_object_or_404(Visit, id=visit_id)
+    visit = get_object_or_404(Visit.objects.select_related("visitor", "employee"), id=visit_id)
     if visit.ended_at is None:
         visit.ended_at = timezone.now()
         visit.status = "ended"
         visit.save(update_fields=["ended_at", "status"])
+        publish_visit_event("ended", visit)
     # Clear active visit from session if it matches
     if request.session.get("active_visit_id") == visit.id:
         request.session.pop("active_visit_id", None)
     return redirect(reverse("visit_detail", args=[visit.id]))
 
 
-def _is_guard(user):
-    return user.is_authenticated and (user.is_superuser or user.groups.filter(name='Guard').exists())
+ONGOING_PAGE_SIZE = 50
+RECENT_PAGE_SIZE = 20
 
 
-@user_passes_test(_is_guard, login_url='/login/')
+@user_passes_test(is_guard, login_url='/login/')
 def dashboard(request):
-    from django.db.models import Q
-    from datetime import datetime, timedelta
+    from datetime import datetime
     import calendar
     
+    # Read before the lists: a delta published while they are queried is
+    # replayed to the page instead of lost
+    events_last_id = broker.last_id
+
     # Get search query and month filter from request
     search_query = request.GET.get('search', '').strip()
     month_filter = request.GET.get('month', '').strip()
     
-    # Base querysets
-    ongoing_base = Visit.objects.filter(status="ongoing")
-    recent_base = Visit.objects.filter(status="ended")
+    # Visits matching the filters, split by status below
+    matching = Visit.objects.all()
     
     # Apply month filter if specified
     if month_filter:
@@ -229,45 +281,53 @@ def dashboard(request):
             else:
                 end_date = datetime(year, month + 1, 1)
             
-            ongoing_base = ongoing_base.filter(started_at__gte=start_date, started_at__lt=end_date)
-            recent_base = recent_base.filter(started_at__gte=start_date, started_at__lt=end_date)
+            matching = matching.filter(started_at__gte=start_date, started_at__lt=end_date)
         except (ValueError, IndexError):
             # Invalid month format, ignore filter
             pass
     
-    # Apply search filter if specified
+    # Apply search filter if specified (full-text backend, best matches first)
+    rank = ()
     if search_query:
-        search_filter = Q(
-            visitor__full_name__icontains=search_query
-        ) | Q(
-            visitor__phone__icontains=search_query
-        ) | Q(
-            employee__name__icontains=search_query
-        ) | Q(
-            employee__department__icontains=search_query
-        ) | Q(
-            purpose__icontains=search_query
-        )
-        
-        ongoing_base = ongoing_base.filter(search_filter)
-        recent_base = recent_base.filter(search_filter)
-    
-    # Final querysets - optimize with select_related for faster queries
-    # Smart limiting based on filters
-    has_filters = bool(search_query or month_filter)
-    
-    # Ongoing visits: Always show all (critical for monitoring active visits)
-    # But cap at 100 to prevent performance issues
-    ongoing = ongoing_base.select_related('visitor', 'employee').order_by("-started_at")[:100]
-    
-    # Recent visits: Limit on initial load, show more when filtering
-    if has_filters:
-        # When filtering/searching: show up to 100 results
-        recent = recent_base.select_related('visitor', 'employee').order_by("-ended_at")[:100]
-    else:
-        # Initial load: limit to 20 for mobile performance
-        recent = recent_base.select_related('visitor', 'employee').order_by("-ended_at")[:20]
+        matching = get_search_backend().filter(matching, search_query)
+        rank = ("-search_rank",)
     
+    # Keyset pagination: (started_at, id) for ongoing, (ended_at, id) for
+    # recent, behind the search rank when searching. An ended visit edited
+    # to have no ended_at sorts by its start so the cursor is never null.
+    ongoing_base = matching.filter(status="ongoing").select_related('visitor', 'employee')
+    recent_base = (
+        matching.filter(status="ended").select_related('visitor', 'employee')
+        .annotate(recent_at=Coalesce("ended_at", "started_at"))
+    )
+    page = request.GET.get('page', '')
+    ongoing, ongoing_next = [], None
+    recent, recent_next = [], None
+    try:
+        if page in ('', 'ongoing'):
+            ongoing, ongoing_next = keyset_paginate(
+                ongoing_base, [*rank, "-started_at", "-id"], request.GET.get('ongoing_cursor'), ONGOING_PAGE_SIZE,
+            )
+        if page in ('', 'recent'):
+            recent, recent_next = keyset_paginate(
+                recent_base, [*rank, "-recent_at", "-id"], request.GET.get('recent_cursor'), RECENT_PAGE_SIZE,
+            )
+    except ValueError:
+        if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+        return HttpResponseBadRequest("Invalid cursor")
+
+    # All badge counts in one aggregate query; next-page requests skip it
+    counts = {}
+    if not page:
+        today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+        counts = matching.aggregate(
+            ongoing_total=Count("id", filter=Q(status="ongoing")),
+            recent_total=Count("id", filter=Q(status="ended")),
+            ended_today=Count("id", filter=Q(status="ended", ended_at__gte=today_start)),
+            total=Count("id"),
+        )
+
     # Get available months for filter dropdown
     available_months = []
     current_year = datetime.now().year
@@ -283,40 +343,212 @@ def dashboard(request):
     # If this is an AJAX request, return JSON
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
         from django.template.loader import render_to_string
-        
-        ongoing_html = render_to_string('visitors/partials/ongoing_visits.html', {
-            'ongoing': ongoing
-        })
-        recent_html = render_to_string('visitors/partials/recent_visits.html', {
-            'recent': recent
-        })
-        
-        return JsonResponse({
-            'ongoing_html': ongoing_html,
-            'recent_html': recent_html,
-            'ongoing_count': ongoing.count(),
-            'recent_count': recent.count()
-        })
-    
+
+        data = {}
+        # A "page" request renders only the next page of one list, for infinite scroll
+        next_page = bool(page)
+        if page in ('', 'ongoing'):
+            data['ongoing_html'] = render_to_string('visitors/partials/ongoing_visits.html', {
+                'ongoing': ongoing, 'ongoing_next': ongoing_next, 'next_page': next_page,
+            }, request=request)
+            data['ongoing_next'] = ongoing_next
+        if page in ('', 'recent'):
+            data['recent_html'] = render_to_string('visitors/partials/recent_visits.html', {
+                'recent': recent, 'recent_next': recent_next, 'next_page': next_page,
+            }, request=request)
+            data['recent_next'] = recent_next
+        if not next_page:
+            data['events_last_id'] = events_last_id
+        if counts:
+            data['ongoing_count'] = counts['ongoing_total']
+            data['recent_count'] = counts['recent_total']
+            data['ended_today_count'] = counts['ended_today']
+            data['total_count'] = counts['total']
+        return JsonResponse(data)
+
     return render(
         request,
         "visitors/dashboard.html",
         {
-            "ongoing": ongoing, 
+            "ongoing": ongoing,
+            "ongoing_next": ongoing_next,
             "recent": recent,
+            "recent_next": recent_next,
+            "counts": counts,
             "search_query": search_query,
             "month_filter": month_filter,
-            "available_months": available_months
+            "available_months": available_months,
+            "events_last_id": events_last_id,
         },
     )
 
 
-@user_passes_test(_is_guard, login_url='/login/')
+@user_passes_test(is_guard, login_url='/login/')
+def dashboard_events(request):
+    """Server-Sent Events stream of visit deltas (created, ended, updated).
+
+    Under ASGI the stream is async and holds no thread; under WSGI it closes
+    periodically and the browser's EventSource reconnects with Last-Event-ID.
+    The first connect passes ``last_id`` (rendered into the page) instead.
+    With ``poll=1`` the events since then are returned at once as JSON, for
+    dashboards turned away with ``event: busy``.
+    """
+    try:
+        last_id = int(request.headers.get("Last-Event-ID") or request.GET.get("last_id") or broker.last_id)
+    except ValueError:
+        last_id = broker.last_id
+    if request.GET.get("poll") == "1":
+        return JsonResponse(poll_events(last_id))
+    if isinstance(request, ASGIRequest):
+        stream = event_stream_async(last_id)
+    else:
+        stream = event_stream(last_id)
+    response = StreamingHttpResponse(stream, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@user_passes_test(is_guard, login_url='/login/')
+def export_data(request, kind: str):
+    """Download employees, visitors or visits as streamed CSV/NDJSON.
+
+    Query parameters: ``format`` (csv or ndjson), ``since``/``until``
+    (YYYY-MM-DD, inclusive) and ``gzip=1``. Rows are streamed straight
+    from a database cursor, so a year of visits is never held in memory.
+    """
+    if kind not in EXPORTS:
+        raise Http404("Unknown export")
+    fmt = request.GET.get("format", "csv")
+    try:
+        since = parse_day(request.GET.get("since"))
+        until = parse_day(request.GET.get("until"))
+    except ValueError:
+        return HttpResponseBadRequest("since/until must be YYYY-MM-DD")
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest("format must be csv or ndjson")
+    compress = request.GET.get("gzip") == "1"
+
+    filename = "-".join([kind] + [d.isoformat() for d in (since, until) if d]) + f".{fmt}"
+    response = StreamingHttpResponse(
+        export_stream(kind, fmt, since, until, compress),
+        content_type="application/gzip" if compress else f"{FORMATS[fmt]}; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}{".gz" if compress else ""}"'
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+@user_passes_test(is_guard, login_url='/login/')
+def visitor_thumbnail(request, name: str):
+    """Serve the square thumbnail of a visitor photo or ID scan.
+
+    Thumbnails are normally made in the background after upload; one that
+    is missing (older uploads, no thumbnail workers) is made here once.
+    Upload names carry a content digest, so browsers may keep the response
+    for a year; ``private`` keeps ID scans out of shared caches.
+    """
+    if not is_thumbnail_source(name):
+        raise Http404("Not a visitor image")
+    thumbnail = thumbnail_name(name)
+    if not default_storage.exists(thumbnail):
+        if not default_storage.exists(name):
+            raise Http404("Image not found")
+        make_thumbnail(name)
+    response = FileResponse(default_storage.open(thumbnail, "rb"), content_type=CONTENT_TYPES[thumbnail.rsplit(".", 1)[-1]])
+    response["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
+
+@user_passes_test(is_guard, login_url='/login/')
 def guard_visit_detail(request, visit_id: int):
-    visit = get_object_or_404(Visit, id=visit_id)
+    visit = get_object_or_404(Visit.objects.select_related("visitor", "employee"), id=visit_id)
     return render(request, "visitors/visit_admin_detail.html", {"visit": visit})
 
 
+REPORT_DEFAULT_DAYS = 30
+REPORT_TOP_EMPLOYEES = 20
+
+
+@user_passes_test(is_guard, login_url='/login/')
+def visit_report(request):
+    """Visit volume, durations and occupancy per day and department.
+
+    Reads only the DailyVisitStats rollups, so the cost does not grow with
+    the Visit table.
+    """
+    today = timezone.localdate()
+    try:
+        until = parse_day(request.GET.get("until")) or today
+        since = parse_day(request.GET.get("since")) or until - timedelta(days=REPORT_DEFAULT_DAYS - 1)
+    except ValueError:
+        return HttpResponseBadRequest("Dates must be YYYY-MM-DD")
+    if since > until:
+        return HttpResponseBadRequest("'since' must not be after 'until'")
+
+    in_range = DailyVisitStats.objects.filter(day__gte=since, day__lte=until)
+    days = list(in_range.filter(employee__isnull=True).order_by("-day"))
+    totals = {"visits": 0, "total_duration_seconds": 0, "peak_concurrent": 0}
+    for row in days:
+        row.average_minutes = row.total_duration_seconds / row.visits / 60 if row.visits else 0
+        totals["visits"] += row.visits
+        totals["total_duration_seconds"] += row.total_duration_seconds
+        totals["peak_concurrent"] = max(totals["peak_concurrent"], row.peak_concurrent)
+    totals["average_minutes"] = totals["total_duration_seconds"] / totals["visits"] / 60 if totals["visits"] else 0
+
+    per_employee = in_range.filter(employee__isnull=False)
+    # p95 does not add up across days; the worst day's is shown instead
+    departments = list(
+        per_employee.values("department")
+        .annotate(visits=Sum("visits"), duration=Sum("total_duration_seconds"), worst_p95=Max("p95_duration_seconds"))
+        .order_by("-visits", "department")
+    )
+    employees = list(
+        per_employee.values("employee_id", "employee__name", "department")
+        .annotate(visits=Sum("visits"), duration=Sum("total_duration_seconds"), worst_p95=Max("p95_duration_seconds"))
+        .order_by("-visits", "employee__name")[:REPORT_TOP_EMPLOYEES]
+    )
+    for row in departments + employees:
+        row["average_minutes"] = row["duration"] / row["visits"] / 60 if row["visits"] else 0
+        row["worst_p95_minutes"] = row["worst_p95"] / 60
+
+    return render(request, "visitors/visit_report.html", {
+        "since": since, "until": until, "days": days, "totals": totals,
+        "departments": departments, "employees": employees,
+    })
+
+
+LONG_VISIT_DEFAULT_HOURS = 4
+LONG_VISIT_LIMIT = 200
+
+
+@user_passes_test(is_guard, login_url='/login/')
+def long_visits(request):
+    """Visits that lasted, or are still running, past ``hours`` hours, longest first.
+
+    Durations come from the database, so the filter and ordering run in
+    SQL instead of loading every visit.
+    """
+    try:
+        hours = float(request.GET.get("hours") or LONG_VISIT_DEFAULT_HOURS)
+    except ValueError:
+        return HttpResponseBadRequest("'hours' must be a number")
+    if not 0 < hours <= 24 * 31:
+        return HttpResponseBadRequest("'hours' must be between 0 and 744")
+
+    matching = longer_than(Visit.objects.all(), int(hours * 3600))
+    visits = list(
+        with_elapsed(matching.select_related("visitor", "employee"))
+        .order_by("-elapsed_seconds", "-id")[:LONG_VISIT_LIMIT]
+    )
+    for visit in visits:
+        visit.elapsed_hours = visit.elapsed_seconds / 3600
+    return render(request, "visitors/long_visits.html", {
+        "hours": hours, "visits": visits, "limit": LONG_VISIT_LIMIT,
+        "ongoing": sum(1 for visit in visits if visit.ended_at is None),
+    })
+
+
 def health_check(request):
     """
     Lightweight health check endpoint for monitoring services.
@@ -328,4 +560,22 @@ def health_check(request):
         "service": "visitor-management"
     })
 
+
+def metrics(request):
+    """
+    Request, database, template and provider timings in the Prometheus text
+    format. Open to guards, or to a scraper sending METRICS_TOKEN as a
+    bearer token.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    authorization = request.headers.get("Authorization", "")
+    if authorization:
+        if not (token and hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode())):
+            return HttpResponseForbidden("Invalid metrics token")
+    elif not is_guard(request.user):
+        return redirect_to_login(request.get_full_path(), login_url='/login/')
+    response = HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+    response["Cache-Control"] = "no-store"
+    return response
+
 # Create your views here.